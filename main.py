@@ -7,58 +7,133 @@ import uvloop
 
 from src.notion.notion_client import NotionClient
 from src.orchestration import (
-    process_telegram_channel,
+    filter_eligible_channels,
     run_checks,
-    upload_state_data_to_notion,
-    upload_timeseries_data_to_notion,
+    sync_leased_telegram_channel,
+    sync_telegram_channel,
 )
+from src.shared.lease_store import LeaseStore
+from src.shared.local_store import LocalStore
 from src.shared.logging_utils import configure_logging
+from src.shared.profiling_utils import start_profiling, stop_profiling
+from src.shared.shared_constants import PROFILE_MODES, PROFILE_OUTPUT_DIR
 from src.telegram.telegram_client import TelegramUserClient
 
 logger = logging.getLogger("main")
 
 
-async def run_async(debug: bool = False):
+async def run_async(
+    debug: bool = False,
+    json_logs: bool = False,
+    profile: str | None = None,
+    lease_store_path: str | None = None,
+    worker_id: str | None = None,
+):
     asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
-    configure_logging(level="DEBUG" if debug else "WARNING")
+    configure_logging(level="DEBUG" if debug else "WARNING", json_output=json_logs)
 
+    try:
+        if profile is not None:
+            click.echo(f"Profiling {profile}, writing reports to {PROFILE_OUTPUT_DIR}")
+            start_profiling(profile)
+
+        await process_channels(lease_store_path, worker_id)
+    finally:
+        stop_profiling()
+
+    click.echo("All channels processed")
+
+
+async def process_channels(lease_store_path: str | None, worker_id: str | None):
     click.echo("Running .env checks")
     run_checks()
     click.echo("All .env checks passed")
 
     click.echo("Initializing clients")
 
-    telegram_client = TelegramUserClient()
-    notion_client = NotionClient()
-
-    click.echo("Fetching channels to process...")
+    local_store = LocalStore()
+    lease_store = None
+    if lease_store_path is not None:
+        lease_store = LeaseStore(lease_store_path, worker_id)
+        click.echo(f"Running as worker {lease_store.worker_id}")
 
-    channels_to_process = await notion_client.get_channels_to_parse()
+    telegram_client = TelegramUserClient(local_store=local_store)
+    notion_client = NotionClient()
 
-    click.echo(f"Channels to process: {channels_to_process}")
+    try:
+        click.echo("Validating Notion database schemas")
+        await notion_client.validate_schemas()
 
-    for channel_name in tqdm.tqdm(channels_to_process):
-        click.echo(f"Processing channel {channel_name}")
+        click.echo("Fetching channels to process...")
 
-        channel_state, channel_timeseries = await process_telegram_channel(
-            telegram_client, channel_name
-        )
+        channels_to_process = await notion_client.get_channels_to_parse()
 
-        click.echo(f"Uploading {len(channel_state)} state entries to Notion...")
-        await upload_state_data_to_notion(notion_client, channel_state)
+        click.echo("Checking stats eligibility...")
 
-        click.echo(
-            f"Uploading {len(channel_timeseries)} timeseries entries to Notion..."
+        await telegram_client.warm_peer_cache(channels_to_process)
+        channels_to_process = await filter_eligible_channels(
+            telegram_client, local_store, channels_to_process
         )
-        await upload_timeseries_data_to_notion(notion_client, channel_timeseries)
 
-    click.echo("All channels processed")
+        click.echo(f"Channels to process: {channels_to_process}")
+
+        for channel_name in tqdm.tqdm(channels_to_process):
+            click.echo(f"Processing channel {channel_name}")
+
+            if lease_store is None:
+                is_synced = await sync_telegram_channel(
+                    telegram_client, notion_client, local_store, channel_name
+                )
+            else:
+                is_synced = await sync_leased_telegram_channel(
+                    lease_store,
+                    telegram_client,
+                    notion_client,
+                    local_store,
+                    channel_name,
+                )
+
+            if is_synced is None:
+                click.echo(f"{channel_name} is claimed by another worker, skipping")
+            elif not is_synced:
+                click.echo(f"No new stats for {channel_name}, skipping")
+    finally:
+        await notion_client.close()
+        local_store.close()
+        if lease_store is not None:
+            lease_store.close()
 
 
 @click.command()
 @click.option("--debug", is_flag=True, help="Run in debug mode", default=False)
-def run(debug: bool = False):
-    asyncio.run(run_async(debug))
+@click.option(
+    "--json-logs", is_flag=True, help="Write logs as JSON lines", default=False
+)
+@click.option(
+    "--profile",
+    type=click.Choice(PROFILE_MODES),
+    default=None,
+    help="Write CPU or allocation profiles per channel and stage",
+)
+@click.option(
+    "--lease-store",
+    "lease_store_path",
+    default=None,
+    help="Shared SQLite file to split channels between workers",
+)
+@click.option(
+    "--worker-id",
+    default=None,
+    help="Worker name in the lease store, defaults to host:pid",
+)
+def run(
+    debug: bool = False,
+    json_logs: bool = False,
+    profile: str | None = None,
+    lease_store_path: str | None = None,
+    worker_id: str | None = None,
+):
+    asyncio.run(run_async(debug, json_logs, profile, lease_store_path, worker_id))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,26 @@
+import logging
+
+import click
+from aiohttp import web
+
+from src.api.api_constants import API_HOST, API_PORT
+from src.api.api_server import create_app
+from src.shared.local_store import LocalStore
+from src.shared.logging_utils import configure_logging
+
+logger = logging.getLogger("serve")
+
+
+@click.command()
+@click.option("--host", default=API_HOST, help="Host to listen on")
+@click.option("--port", default=API_PORT, help="Port to listen on")
+@click.option("--debug", is_flag=True, help="Run in debug mode", default=False)
+def serve(host: str = API_HOST, port: int = API_PORT, debug: bool = False):
+    configure_logging(level="DEBUG" if debug else "WARNING")
+
+    click.echo(f"Serving cached stats on http://{host}:{port}")
+    web.run_app(create_app(LocalStore()), host=host, port=port, print=None)
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,6 @@
+# --- Read API ---
+API_HOST = "127.0.0.1"
+API_PORT = 8080
+
+# Responses smaller than this are not worth compressing
+API_COMPRESSION_MIN_BYTES = 1024
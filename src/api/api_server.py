@@ -0,0 +1,122 @@
+import logging
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from typing import Any
+
+import pandas as pd
+from aiohttp import web
+
+from src.api.api_constants import API_COMPRESSION_MIN_BYTES
+from src.shared.local_store import STATS_TABLES, LocalStore
+from src.shared.records import RollupRecord
+from src.shared.rollup_utils import compute_timeseries_rollups
+from src.shared.shared_constants import ROLLUP_WINDOWS
+
+logger = logging.getLogger("api_server")
+
+LOCAL_STORE_KEY = web.AppKey("local_store", LocalStore)
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def json_response(data: Any) -> web.Response:
+    response = web.json_response(data)
+
+    body = response.body
+    if isinstance(body, bytes) and len(body) >= API_COMPRESSION_MIN_BYTES:
+        # Uses gzip or deflate, whichever the client accepts
+        response.enable_compression()
+
+    return response
+
+
+def get_date_range(request: web.Request) -> tuple[str | None, str | None]:
+    """
+    Read the optional `start` and `end` (YYYY-MM-DD) query parameters.
+    """
+    dates: list[str | None] = []
+
+    for name in ("start", "end"):
+        value = request.query.get(name, None)
+        if value is not None:
+            try:
+                datetime.strptime(value, DATE_FORMAT)
+            except ValueError:
+                raise web.HTTPBadRequest(
+                    text=f"{name} must be a date in YYYY-MM-DD format"
+                ) from None
+        dates.append(value)
+
+    start, end = dates
+    return start, end
+
+
+async def list_channels(request: web.Request) -> web.Response:
+    local_store = request.app[LOCAL_STORE_KEY]
+    return json_response(local_store.list_channels())
+
+
+async def get_stats(request: web.Request) -> web.Response:
+    local_store = request.app[LOCAL_STORE_KEY]
+    handle = request.match_info["handle"]
+    table = f"channel_{request.match_info['kind']}"
+
+    if table not in STATS_TABLES:
+        raise web.HTTPNotFound()
+
+    start, end = get_date_range(request)
+    return json_response(local_store.query_stats(table, handle, start, end))
+
+
+async def get_aggregate(request: web.Request) -> web.Response:
+    local_store = request.app[LOCAL_STORE_KEY]
+    handle = request.match_info["handle"]
+
+    start, end = get_date_range(request)
+    return json_response(local_store.aggregate_timeseries(handle, start, end))
+
+
+async def get_rollups(request: web.Request) -> web.Response:
+    local_store = request.app[LOCAL_STORE_KEY]
+    handle = request.match_info["handle"]
+
+    start, end = get_date_range(request)
+
+    # Windows ending on `start` need the days before it
+    history_start = None
+    if start is not None:
+        history_start = (
+            datetime.strptime(start, DATE_FORMAT) - timedelta(days=max(ROLLUP_WINDOWS))
+        ).strftime(DATE_FORMAT)
+
+    rows = local_store.query_stats("channel_timeseries", handle, history_start, end)
+
+    timeseries_data = pd.DataFrame(
+        rows, columns=["handle", "date", "joined", "mute", "left", "followers"]
+    )
+    timeseries_data["date"] = pd.to_datetime(timeseries_data["date"])
+
+    rollup_data = compute_timeseries_rollups(
+        timeseries_data, since=pd.Timestamp(start) if start is not None else None
+    )
+
+    return json_response(
+        [asdict(record) for record in RollupRecord.from_frame(rollup_data)]
+    )
+
+
+def create_app(local_store: LocalStore) -> web.Application:
+    app = web.Application()
+    app[LOCAL_STORE_KEY] = local_store
+
+    app.router.add_get("/channels", list_channels)
+    app.router.add_get("/channels/{handle}/aggregate", get_aggregate)
+    app.router.add_get("/channels/{handle}/rollups", get_rollups)
+    app.router.add_get("/channels/{handle}/{kind}", get_stats)
+
+    async def close_local_store(app: web.Application) -> None:
+        app[LOCAL_STORE_KEY].close()
+
+    app.on_cleanup.append(close_local_store)
+
+    return app
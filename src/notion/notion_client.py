@@ -1,20 +1,173 @@
+import importlib.util
+import logging
 import os
 from typing import Any, cast
+from urllib.parse import unquote
 
+import httpx
 from dotenv import load_dotenv
 from notion_client import AsyncClient
+from notion_client.errors import APIErrorCode, APIResponseError
 
-from src.notion.notion_constants import CHANNELS_LIST_DATABASE_ID
+from src.notion.notion_constants import (
+    CHANNEL_POSTS_HANDLE_NAME,
+    CHANNEL_POSTS_MESSAGE_ID_NAME,
+    CHANNELS_LIST_DATABASE_ID,
+    CHANNELS_LIST_HANDLE_ID,
+    EXPECTED_DATABASE_SCHEMAS,
+    NOTION_CONNECT_TIMEOUT_SECONDS,
+    NOTION_KEEPALIVE_EXPIRY_SECONDS,
+    NOTION_MAX_CONNECTIONS,
+    NOTION_MAX_KEEPALIVE_CONNECTIONS,
+    NOTION_READ_TIMEOUT_SECONDS,
+    NOTION_USE_HTTP2,
+)
 from src.notion.notion_utils import process_channels_list_data
 
+logger = logging.getLogger("notion_client")
+
 load_dotenv()
 
 
 class NotionClient:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        max_connections: int = NOTION_MAX_CONNECTIONS,
+        max_keepalive_connections: int = NOTION_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = NOTION_KEEPALIVE_EXPIRY_SECONDS,
+        connect_timeout: float = NOTION_CONNECT_TIMEOUT_SECONDS,
+        read_timeout: float = NOTION_READ_TIMEOUT_SECONDS,
+        http2: bool = NOTION_USE_HTTP2,
+    ) -> None:
         api_key = os.getenv("NOTION_API_KEY")
         assert api_key is not None, "NOTION_API_KEY is not set"
-        self.client = AsyncClient(auth=api_key)
+        assert max_connections > 0, "Max connections must be a positive number"
+        assert max_keepalive_connections >= 0, (
+            "Max keepalive connections must be a positive number"
+        )
+
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning(
+                "HTTP/2 requires the `http2` extra, falling back to HTTP/1.1"
+            )
+            http2 = False
+
+        timeout = httpx.Timeout(
+            read_timeout,
+            connect=connect_timeout,
+            pool=read_timeout,
+        )
+
+        # A single pooled transport is shared by every request of the run
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            http2=http2,
+        )
+
+        self.client = AsyncClient(
+            auth=api_key,
+            client=self.http_client,
+            timeout_ms=int(read_timeout * 1000),
+        )
+        # AsyncClient overrides the timeout with a single value, restore ours
+        self.http_client.timeout = timeout
+
+        # database_id -> database object as returned by `databases.retrieve`
+        self._schemas: dict[str, dict[str, Any]] = {}
+
+    async def close(self) -> None:
+        """
+        Close the pooled HTTP connections.
+        """
+        await self.http_client.aclose()
+
+    async def __aenter__(self) -> "NotionClient":
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        await self.close()
+
+    async def get_database_schema(
+        self, database_id: str, refresh: bool = False
+    ) -> dict[str, Any]:
+        """
+        Get the properties of a database, fetching them once and caching the result.
+        """
+        assert (
+            database_id is not None
+            and isinstance(database_id, str)
+            and len(database_id) > 0
+        ), "Database ID is not set"
+
+        cached = self._schemas.get(database_id, None)
+        if cached is not None and not refresh:
+            return cached["properties"]
+
+        client = cast(AsyncClient, self.client)
+
+        database = await client.databases.retrieve(database_id=database_id)
+
+        last_edited_time = database.get("last_edited_time", None)
+        if cached is not None and cached.get("last_edited_time") != last_edited_time:
+            logger.warning("Schema of database %s has changed", database_id)
+
+        self._schemas[database_id] = database
+
+        return database["properties"]
+
+    def invalidate_database_schema(self, database_id: str) -> None:
+        """
+        Drop the cached schema of a database so it is fetched again on next use.
+        """
+        self._schemas.pop(database_id, None)
+
+    async def get_title_property_id(self, database_id: str) -> str:
+        """
+        Get the id of the title property of a database.
+        """
+        properties = await self.get_database_schema(database_id)
+
+        for prop in properties.values():
+            if prop.get("type", None) == "title":
+                return prop["id"]
+
+        raise ValueError(f"Database {database_id} has no title property")
+
+    async def get_property_id(self, database_id: str, name: str) -> str:
+        """
+        Get the id of a property of a database, decoded for use as a query param.
+        """
+        properties = await self.get_database_schema(database_id)
+
+        prop = properties.get(name, None)
+        assert prop is not None, f"Property '{name}' is missing in {database_id}"
+
+        # Schema ids are percent-encoded, httpx encodes query params again
+        return unquote(prop["id"])
+
+    async def validate_schemas(self) -> None:
+        """
+        Check the property ids in notion_constants against the live database schemas.
+        """
+        for database_id, expected in EXPECTED_DATABASE_SCHEMAS.items():
+            properties = await self.get_database_schema(database_id, refresh=True)
+
+            for name, property_id in expected.items():
+                prop = properties.get(name, None)
+
+                assert prop is not None, (
+                    f"Property '{name}' is missing in database {database_id}"
+                )
+                assert property_id is None or prop.get("id", None) == property_id, (
+                    f"Property '{name}' in database {database_id} has id "
+                    f"'{prop.get('id', None)}', expected '{property_id}'"
+                )
+
+            logger.info("Schema of database %s is valid", database_id)
 
     async def query_database(self, database_id: str) -> None:
         assert (
@@ -39,10 +192,20 @@ class NotionClient:
 
         client = cast(AsyncClient, self.client)
 
-        results = await client.pages.create(
-            parent={"database_id": database_id},
-            properties=data,
-        )
+        try:
+            results = await client.pages.create(
+                parent={"database_id": database_id},
+                properties=data,
+            )
+        except APIResponseError as e:
+            if e.code == APIErrorCode.ValidationError:
+                logger.error(
+                    "Entry was rejected by database %s, refreshing its schema: %s",
+                    database_id,
+                    e,
+                )
+                self.invalidate_database_schema(database_id)
+            raise e from None
 
         return results
 
@@ -64,6 +227,9 @@ class NotionClient:
 
         client = cast(AsyncClient, self.client)
 
+        # Only existence matters, so ask for a single page with the title only
+        title_property_id = await self.get_title_property_id(database_id)
+
         response = await client.databases.query(
             database_id=database_id,
             filter={
@@ -72,6 +238,8 @@ class NotionClient:
                     {"property": "Handle", "rich_text": {"equals": handle}},
                 ],
             },
+            filter_properties=[title_property_id],
+            page_size=1,
         )
 
         results = response.get("results", None)
@@ -79,6 +247,67 @@ class NotionClient:
 
         return not is_empty
 
+    async def get_present_message_ids(
+        self, database_id: str, handle: str, message_ids: list[int]
+    ) -> set[int]:
+        """
+        Get which of the given message ids already have a page for the handle.
+
+        Pages are fetched in bulk with only the message id property, instead of
+        one query per message.
+        """
+        assert (
+            database_id is not None
+            and isinstance(database_id, str)
+            and len(database_id) > 0
+        ), "Database ID is not set"
+        assert handle is not None and isinstance(handle, str) and len(handle) > 0, (
+            "Handle is not set"
+        )
+
+        if not message_ids:
+            return set()
+
+        client = cast(AsyncClient, self.client)
+
+        message_id_property = await self.get_property_id(
+            database_id, CHANNEL_POSTS_MESSAGE_ID_NAME
+        )
+
+        present: set[int] = set()
+        start_cursor = None
+
+        while True:
+            response = await client.databases.query(
+                database_id=database_id,
+                filter={
+                    "and": [
+                        {
+                            "property": CHANNEL_POSTS_HANDLE_NAME,
+                            "rich_text": {"equals": handle},
+                        },
+                        {
+                            "property": CHANNEL_POSTS_MESSAGE_ID_NAME,
+                            "number": {"greater_than_or_equal_to": min(message_ids)},
+                        },
+                    ],
+                },
+                filter_properties=[message_id_property],
+                page_size=100,
+                **({"start_cursor": start_cursor} if start_cursor else {}),
+            )
+
+            for page in response.get("results", []):
+                prop = page["properties"].get(CHANNEL_POSTS_MESSAGE_ID_NAME, {})
+                if prop.get("number", None) is not None:
+                    present.add(int(prop["number"]))
+
+            start_cursor = response.get("next_cursor", None)
+            if not response.get("has_more", False) or start_cursor is None:
+                break
+
+        return present & set(message_ids)
+
     async def get_channels_to_parse(self) -> list[str]:
         assert (
             CHANNELS_LIST_DATABASE_ID is not None
@@ -88,7 +317,10 @@ class NotionClient:
 
         client = cast(AsyncClient, self.client)
 
-        results = await client.databases.query(database_id=CHANNELS_LIST_DATABASE_ID)
+        results = await client.databases.query(
+            database_id=CHANNELS_LIST_DATABASE_ID,
+            filter_properties=[CHANNELS_LIST_HANDLE_ID],
+        )
 
         results = process_channels_list_data(results.get("results", None))
 
@@ -9,6 +9,14 @@ STATE_SHARES_ID = "rCCN"
 STATE_DATE_ID = "%5Eq_%5D"
 STATE_HANDLE_ID = "title"
 
+# --- Channel State DataFrame Columns (Telegram metric -> column) ---
+STATE_METRIC_COLUMNS = {
+    "followers": "followers",
+    "reactions_per_post": "reactions",
+    "views_per_post": "views",
+    "shares_per_post": "shares",
+}
+
 # --- Channel Timeseries Database ---
 CHANNEL_TIMESERIES_DATABASE_ID = "25405f3bbeea802796bdc9aaca15b443"
 
@@ -20,5 +28,102 @@ CHANNEL_TIMESERIES_LEFT_ID = "hxHR"
 CHANNEL_TIMESERIES_TOTAL_FOLLOWERS_ID = "sIG%3F"
 CHANNEL_TIMESERIES_HANDLE_ID = "title"
 
+# --- Channel Rollup Database ---
+# Leave empty to skip uploading rollups
+#
+# Rows are deduped by handle and date and never updated. A window without a full
+# set of days (the first 29 days of a channel's history for 30d) is uploaded
+# empty and stays empty, even if older days become available later.
+CHANNEL_ROLLUP_DATABASE_ID = ""
+
+# --- Channel Rollup Database Properties (looked up by name) ---
+CHANNEL_ROLLUP_DATE_NAME = "Date"
+CHANNEL_ROLLUP_HANDLE_NAME = "Handle"
+CHANNEL_ROLLUP_METRIC_NAMES = {
+    "net_growth_7d": "Net growth 7d",
+    "churn_rate_7d": "Churn rate 7d",
+    "mute_ratio_7d": "Mute ratio 7d",
+    "net_growth_30d": "Net growth 30d",
+    "churn_rate_30d": "Churn rate 30d",
+    "mute_ratio_30d": "Mute ratio 30d",
+}
+
+# --- Channel Posts Database ---
+# Leave empty to skip fetching and uploading post stats
+CHANNEL_POSTS_DATABASE_ID = ""
+
+# --- Channel Posts Database Properties (looked up by name) ---
+CHANNEL_POSTS_DATE_NAME = "Date"
+CHANNEL_POSTS_HANDLE_NAME = "Handle"
+CHANNEL_POSTS_MESSAGE_ID_NAME = "Message ID"
+CHANNEL_POSTS_VIEWS_NAME = "Views"
+CHANNEL_POSTS_FORWARDS_NAME = "Forwards"
+CHANNEL_POSTS_REACTIONS_NAME = "Reactions"
+
 # --- List of Channels ---
 CHANNELS_LIST_DATABASE_ID = "25405f3bbeea80bdbaf0fe03ece2aab6"
+
+# --- List of Channels Properties ---
+CHANNELS_LIST_HANDLE_ID = "title"
+
+# --- Expected Database Schemas (property name -> property id) ---
+STATE_PROPERTIES: dict[str, str | None] = {
+    "Followers Per Post": STATE_FOLLOWERS_ID,
+    "Reactions Per Post": STATE_REACTIONS_ID,
+    "Views Per Post": STATE_VIEWS_ID,
+    "Shares Per Post": STATE_SHARES_ID,
+    "Date": STATE_DATE_ID,
+    "Handle": STATE_HANDLE_ID,
+}
+
+CHANNEL_TIMESERIES_PROPERTIES: dict[str, str | None] = {
+    "Joined": CHANNEL_TIMESERIES_JOINED_ID,
+    "Date": CHANNEL_TIMESERIES_DATE_ID,
+    "Mute": CHANNEL_TIMESERIES_MUTE_ID,
+    "Left": CHANNEL_TIMESERIES_LEFT_ID,
+    "Total followers": CHANNEL_TIMESERIES_TOTAL_FOLLOWERS_ID,
+    "Handle": CHANNEL_TIMESERIES_HANDLE_ID,
+}
+
+CHANNELS_LIST_PROPERTIES: dict[str, str | None] = {
+    "Handle": CHANNELS_LIST_HANDLE_ID,
+}
+
+# Rollup property ids are not pinned, only their presence is checked
+CHANNEL_ROLLUP_PROPERTIES: dict[str, str | None] = {
+    CHANNEL_ROLLUP_DATE_NAME: None,
+    CHANNEL_ROLLUP_HANDLE_NAME: "title",
+} | dict.fromkeys(CHANNEL_ROLLUP_METRIC_NAMES.values())
+
+CHANNEL_POSTS_PROPERTIES: dict[str, str | None] = {
+    CHANNEL_POSTS_DATE_NAME: None,
+    CHANNEL_POSTS_HANDLE_NAME: "title",
+    CHANNEL_POSTS_MESSAGE_ID_NAME: None,
+    CHANNEL_POSTS_VIEWS_NAME: None,
+    CHANNEL_POSTS_FORWARDS_NAME: None,
+    CHANNEL_POSTS_REACTIONS_NAME: None,
+}
+
+EXPECTED_DATABASE_SCHEMAS: dict[str, dict[str, str | None]] = {
+    CHANNEL_STATE_DATABASE_ID: STATE_PROPERTIES,
+    CHANNEL_TIMESERIES_DATABASE_ID: CHANNEL_TIMESERIES_PROPERTIES,
+    CHANNELS_LIST_DATABASE_ID: CHANNELS_LIST_PROPERTIES,
+}
+
+if CHANNEL_ROLLUP_DATABASE_ID:
+    EXPECTED_DATABASE_SCHEMAS[CHANNEL_ROLLUP_DATABASE_ID] = CHANNEL_ROLLUP_PROPERTIES
+
+if CHANNEL_POSTS_DATABASE_ID:
+    EXPECTED_DATABASE_SCHEMAS[CHANNEL_POSTS_DATABASE_ID] = CHANNEL_POSTS_PROPERTIES
+
+# --- HTTP Transport ---
+# Requests are sent one at a time, the pool only keeps connections warm between
+# them. Notion allows ~3 requests per second per integration anyway.
+NOTION_POOL_SIZE = 3
+NOTION_MAX_CONNECTIONS = NOTION_POOL_SIZE
+NOTION_MAX_KEEPALIVE_CONNECTIONS = NOTION_POOL_SIZE
+NOTION_KEEPALIVE_EXPIRY_SECONDS = 30.0
+NOTION_CONNECT_TIMEOUT_SECONDS = 5.0
+NOTION_READ_TIMEOUT_SECONDS = 60.0
+# Needs the `http2` extra (`uv sync --extra http2`)
+NOTION_USE_HTTP2 = False
@@ -3,6 +3,15 @@ from typing import Any
 import pandas as pd
 
 from src.notion.notion_constants import (
+    CHANNEL_POSTS_DATE_NAME,
+    CHANNEL_POSTS_FORWARDS_NAME,
+    CHANNEL_POSTS_HANDLE_NAME,
+    CHANNEL_POSTS_MESSAGE_ID_NAME,
+    CHANNEL_POSTS_REACTIONS_NAME,
+    CHANNEL_POSTS_VIEWS_NAME,
+    CHANNEL_ROLLUP_DATE_NAME,
+    CHANNEL_ROLLUP_HANDLE_NAME,
+    CHANNEL_ROLLUP_METRIC_NAMES,
     CHANNEL_TIMESERIES_DATE_ID,
     CHANNEL_TIMESERIES_HANDLE_ID,
     CHANNEL_TIMESERIES_JOINED_ID,
@@ -12,14 +21,21 @@ from src.notion.notion_constants import (
     STATE_DATE_ID,
     STATE_FOLLOWERS_ID,
     STATE_HANDLE_ID,
+    STATE_METRIC_COLUMNS,
     STATE_REACTIONS_ID,
     STATE_SHARES_ID,
     STATE_VIEWS_ID,
 )
+from src.shared.records import AbsValueAndPrev, GraphSeries
 
 
 def process_state_data(
-    date: str, handle: str, followers: int, reactions: int, views: int, shares: int
+    date: str,
+    handle: str,
+    followers: float,
+    reactions: float,
+    views: float,
+    shares: float,
 ) -> dict[str, Any]:
     """
     Process the channel state data and transform into Notion expected format.
@@ -139,6 +155,88 @@ def process_timeseries_data(
     return timeseries_data
 
 
+def process_rollup_data(
+    date: str, handle: str, metrics: dict[str, float | None]
+) -> dict[str, Any]:
+    """
+    Process the channel rollup data and transform into Notion expected format.
+    """
+    assert isinstance(date, str), "Date must be a string"
+    assert isinstance(handle, str), "Handle must be a string"
+
+    rollup_data: dict[str, Any] = {
+        CHANNEL_ROLLUP_DATE_NAME: {
+            "type": "date",
+            "date": {"start": date, "end": None, "time_zone": None},
+        },
+        CHANNEL_ROLLUP_HANDLE_NAME: {
+            "type": "title",
+            "title": [
+                {
+                    "type": "text",
+                    "text": {"content": handle, "link": None},
+                    "plain_text": handle,
+                    "href": None,
+                }
+            ],
+        },
+    }
+
+    for metric, value in metrics.items():
+        rollup_data[CHANNEL_ROLLUP_METRIC_NAMES[metric]] = {
+            "type": "number",
+            "number": value,
+        }
+
+    return rollup_data
+
+
+def process_post_data(
+    date: str,
+    handle: str,
+    message_id: int,
+    views: int,
+    forwards: int,
+    reactions: int,
+) -> dict[str, Any]:
+    """
+    Process the channel post data and transform into Notion expected format.
+    """
+    assert message_id is not None and message_id > 0, "Message ID must be set"
+    assert views is not None and views >= 0, "Views must be a positive number"
+    assert forwards is not None and forwards >= 0, "Forwards must be a positive number"
+    assert reactions is not None and reactions >= 0, (
+        "Reactions must be a positive number"
+    )
+
+    assert isinstance(date, str), "Date must be a string"
+    assert isinstance(handle, str), "Handle must be a string"
+
+    post_data = {
+        CHANNEL_POSTS_DATE_NAME: {
+            "type": "date",
+            "date": {"start": date, "end": None, "time_zone": None},
+        },
+        CHANNEL_POSTS_HANDLE_NAME: {
+            "type": "title",
+            "title": [
+                {
+                    "type": "text",
+                    "text": {"content": handle, "link": None},
+                    "plain_text": handle,
+                    "href": None,
+                }
+            ],
+        },
+        CHANNEL_POSTS_MESSAGE_ID_NAME: {"type": "number", "number": message_id},
+        CHANNEL_POSTS_VIEWS_NAME: {"type": "number", "number": views},
+        CHANNEL_POSTS_FORWARDS_NAME: {"type": "number", "number": forwards},
+        CHANNEL_POSTS_REACTIONS_NAME: {"type": "number", "number": reactions},
+    }
+
+    return post_data
+
+
 def process_channels_list_data(results: list[dict[str, Any]]) -> list[str]:
     """
     Process the channels list data and transform into Notion expected format.
@@ -164,61 +262,39 @@ def process_channels_list_data(results: list[dict[str, Any]]) -> list[str]:
     return channels_to_parse
 
 
-def format_telegram_state_data(  # noqa: C901
-    results_dict: dict[str, Any], handle: str
+def format_telegram_state_data(
+    results_dict: dict[str, AbsValueAndPrev], handle: str
 ) -> pd.DataFrame:
     """
     Format telegram stats response for state_data DataFrame.
     """
-    rows = []
-
-    all_dates = set()
-    for metric_key, metric_data in results_dict.items():
-        for entry in metric_data:
-            # Extract date (assuming first key is the date)
-            date_key = next(iter(entry.keys()))
-            if (
-                date_key != metric_key.replace("_", " ").title()
-            ):  # Skip the duplicate value key
-                all_dates.add(date_key)
-
-    # Process each date
-    for date in sorted(all_dates):
-        row = {
-            "date": date,
-            "handle": handle,
-            "followers": None,
-            "reactions": None,
-            "views": None,
-            "shares": None,
-        }
-
-        # Extract values for this date from each metric
-        for metric_key, metric_data in results_dict.items():
-            for entry in metric_data:
-                if date in entry:
-                    if metric_key == "followers":
-                        row["followers"] = entry[date]
-                    elif metric_key == "reactions_per_post":
-                        row["reactions"] = entry[date]
-                    elif metric_key == "views_per_post":
-                        row["views"] = entry[date]
-                    elif metric_key == "shares_per_post":
-                        row["shares"] = entry[date]
-
-        rows.append(row)
-
-    # Create DataFrame
-    state_data = pd.DataFrame(rows)
-
-    # Convert date column to datetime if needed
+    rows: dict[str, dict[str, Any]] = {}
+
+    for metric_key, metric in results_dict.items():
+        column = STATE_METRIC_COLUMNS[metric_key]
+
+        for date, value in (
+            (metric.previous_date, metric.previous),
+            (metric.date, metric.current),
+        ):
+            row = rows.setdefault(
+                date,
+                {"date": date, "handle": handle}
+                | dict.fromkeys(STATE_METRIC_COLUMNS.values()),
+            )
+            row[column] = value
+
+    state_data = pd.DataFrame(
+        [rows[date] for date in sorted(rows)],
+        columns=["date", "handle", *STATE_METRIC_COLUMNS.values()],
+    )
     state_data["date"] = pd.to_datetime(state_data["date"])
 
     return state_data
 
 
 def format_telegram_timeseries_data(
-    results_dict: dict[str, Any], handle: str
+    results_dict: dict[str, GraphSeries], handle: str
 ) -> pd.DataFrame:
     """
     Format telegram stats response for timeseries_data DataFrame.
@@ -226,8 +302,7 @@ def format_telegram_timeseries_data(
 
     all_dates = set()
     for graph_data in results_dict.values():
-        for entry in graph_data:
-            all_dates.add(entry["date"])
+        all_dates.update(graph_data.dates)
 
     all_dates = sorted(all_dates)
 
@@ -236,8 +311,7 @@ def format_telegram_timeseries_data(
     )
 
     if "growth_graph" in results_dict:
-        growth_df = pd.DataFrame(results_dict["growth_graph"])
-        growth_df["date"] = pd.to_datetime(growth_df["date"])
+        growth_df = results_dict["growth_graph"].to_frame()
         growth_df = growth_df.rename(columns={"Total followers": "followers"})
         timeseries_data = timeseries_data.merge(
             growth_df[["date", "followers"]], on="date", how="left"
@@ -246,8 +320,7 @@ def format_telegram_timeseries_data(
         timeseries_data["followers"] = 0
 
     if "followers_graph" in results_dict:
-        followers_df = pd.DataFrame(results_dict["followers_graph"])
-        followers_df["date"] = pd.to_datetime(followers_df["date"])
+        followers_df = results_dict["followers_graph"].to_frame()
         followers_df = followers_df.rename(columns={"Joined": "joined", "Left": "left"})
         timeseries_data = timeseries_data.merge(
             followers_df[["date", "joined", "left"]], on="date", how="left"
@@ -257,8 +330,7 @@ def format_telegram_timeseries_data(
         timeseries_data["left"] = 0
 
     if "mute_graph" in results_dict:
-        mute_df = pd.DataFrame(results_dict["mute_graph"])
-        mute_df["date"] = pd.to_datetime(mute_df["date"])
+        mute_df = results_dict["mute_graph"].to_frame()
         mute_df = mute_df.rename(columns={"Muted": "mute"})
         timeseries_data = timeseries_data.merge(
             mute_df[["date", "mute"]], on="date", how="left"
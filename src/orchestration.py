@@ -1,22 +1,53 @@
+import asyncio
 import logging
 import os
-from typing import TYPE_CHECKING
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any, cast
 
 import pandas as pd
 import tqdm
 from dotenv import load_dotenv
 
 from src.notion.notion_constants import (
+    CHANNEL_POSTS_DATABASE_ID,
+    CHANNEL_ROLLUP_DATABASE_ID,
     CHANNEL_STATE_DATABASE_ID,
     CHANNEL_TIMESERIES_DATABASE_ID,
 )
 from src.notion.notion_utils import (
     format_telegram_state_data,
     format_telegram_timeseries_data,
+    process_post_data,
+    process_rollup_data,
     process_state_data,
     process_timeseries_data,
 )
+from src.shared.profiling_utils import profile_channel, profile_stage
+from src.shared.records import (
+    AbsValueAndPrev,
+    DatedRecord,
+    GraphSeries,
+    PostRecord,
+    RollupRecord,
+    StateRecord,
+    TimeseriesRecord,
+)
+from src.shared.rollup_utils import compute_timeseries_rollups, get_rollup_columns
+from src.shared.shared_constants import (
+    CHANNEL_SYNC_NAMESPACE,
+    GRAPH_WATERMARK_NAMESPACE,
+    LEASE_RENEW_INTERVAL_SECONDS,
+    ROLLUP_WINDOWS,
+    TIMESERIES_HISTORY_NAMESPACE,
+)
+from src.telegram.telegram_constants import (
+    TELEGRAM_ELIGIBILITY_NAMESPACE,
+    TELEGRAM_ELIGIBLE_TTL_SECONDS,
+    TELEGRAM_GRAPH_RECHECK_DAYS,
+    TELEGRAM_INELIGIBLE_TTL_SECONDS,
+)
 from src.telegram.telegram_utils import (
+    get_stats_fingerprint,
     is_channel_state,
     is_processable_graph,
     process_abs_value_and_prev,
@@ -25,11 +56,69 @@ from src.telegram.telegram_utils import (
 
 if TYPE_CHECKING:
     from src.notion.notion_client import NotionClient
+    from src.shared.lease_store import LeaseStore
+    from src.shared.local_store import LocalStore
     from src.telegram.telegram_client import TelegramUserClient
 
 logger = logging.getLogger("orchestration")
 
 
+async def filter_eligible_channels(
+    telegram_client: "TelegramUserClient",
+    local_store: "LocalStore",
+    channel_names: list[str],
+) -> list[str]:
+    """
+    Keep only the channels the logged in user can get stats for.
+
+    Results, negative ones included, are cached in the local store so Telegram
+    is only asked again once they expire.
+    """
+    eligibility: dict[str, bool | None] = {}
+    to_check: list[str] = []
+
+    for channel_name in channel_names:
+        cached = local_store.get(TELEGRAM_ELIGIBILITY_NAMESPACE, channel_name)
+        if cached is None:
+            to_check.append(channel_name)
+        else:
+            eligibility[channel_name] = cached
+
+    logger.info(
+        "Stats eligibility cached for %s channels, checking %s",
+        len(eligibility),
+        len(to_check),
+    )
+
+    if to_check:
+        checked = await telegram_client.get_stats_eligibility(to_check)
+
+        for channel_name, is_eligible in checked.items():
+            # Channels we could not check are not cached and get a stats attempt
+            if is_eligible is not None:
+                local_store.set(
+                    TELEGRAM_ELIGIBILITY_NAMESPACE,
+                    channel_name,
+                    is_eligible,
+                    ttl=TELEGRAM_ELIGIBLE_TTL_SECONDS
+                    if is_eligible
+                    else TELEGRAM_INELIGIBLE_TTL_SECONDS,
+                )
+            eligibility[channel_name] = is_eligible
+
+    eligible_channels = [
+        channel_name
+        for channel_name in channel_names
+        if eligibility.get(channel_name, None) is not False
+    ]
+
+    skipped = len(channel_names) - len(eligible_channels)
+    if skipped > 0:
+        logger.warning("Skipping %s channels not eligible for stats", skipped)
+
+    return eligible_channels
+
+
 async def process_telegram_channel(
     telegram_client: "TelegramUserClient",
     channel_name: str,
@@ -39,153 +128,472 @@ async def process_telegram_channel(
     telegram_stats = await telegram_client.get_stats(channel_name)
     telegram_stats_dict = telegram_stats.to_dict()
 
-    state_data = {}
-    timeseries_data = {}
-
-    for key, value in telegram_stats_dict.items():
-        if is_channel_state(key, value):
-            results = process_abs_value_and_prev(key, value)
-            state_data[key] = results
-        elif is_processable_graph(key, value):
-            results = process_graph_data(value)
-            timeseries_data[key] = results
-
-    state_data = format_telegram_state_data(state_data, channel_name)
-    timeseries_data = format_telegram_timeseries_data(timeseries_data, channel_name)
+    state_data, timeseries_data, _ = process_telegram_stats(
+        telegram_stats_dict, channel_name
+    )
 
     return state_data, timeseries_data
 
 
-async def upload_state_data_to_notion(
-    notion_client: "NotionClient",
+def process_telegram_stats(
+    telegram_stats_dict: dict[str, Any],
+    channel_name: str,
+    watermarks: dict[str, str] | None = None,
+    recheck_days: int = TELEGRAM_GRAPH_RECHECK_DAYS,
+) -> tuple[pd.DataFrame, pd.DataFrame, dict[str, str]]:
+    """
+    Parse a stats response into state and timeseries DataFrames.
+
+    Graphs are merged into one row per date, so they are all parsed from the same
+    cutoff: `recheck_days` before the oldest watermark (last synced date) of the
+    graphs in the response, or in full if one of them has none. Days past the end
+    of the shortest graph are left for the next run. Also returns the updated
+    watermarks.
+    """
+    watermarks = dict(watermarks or {})
+    state_values: dict[str, AbsValueAndPrev] = {}
+    graphs: dict[str, dict[str, Any]] = {}
+    graph_series: dict[str, GraphSeries] = {}
+
+    with profile_stage("parse"):
+        for key, value in telegram_stats_dict.items():
+            if is_channel_state(key, value):
+                state_values[key] = process_abs_value_and_prev(value)
+            elif is_processable_graph(key, value):
+                graphs[key] = value
+
+        since = None
+        if graphs and all(key in watermarks for key in graphs):
+            since = min(watermarks[key] for key in graphs)
+
+        for key, value in graphs.items():
+            results = process_graph_data(value, since=since, recheck_days=recheck_days)
+            if results:
+                graph_series[key] = results
+
+        if graph_series:
+            # A date missing from one graph would come out as zeros in the merge
+            last_date = min(results.dates[-1] for results in graph_series.values())
+            for key, results in graph_series.items():
+                graph_series[key] = results.until(last_date)
+                watermarks[key] = last_date
+
+    with profile_stage("format"):
+        state_data = format_telegram_state_data(state_values, channel_name)
+        timeseries_data = format_telegram_timeseries_data(graph_series, channel_name)
+
+    return state_data, timeseries_data, watermarks
+
+
+def rollup_timeseries_data(
+    local_store: "LocalStore",
+    timeseries_data: pd.DataFrame,
+    channel_name: str,
+) -> pd.DataFrame:
+    """
+    Compute rolling summaries for the windows touched by new timeseries days.
+
+    The last days of each channel are kept in the local store, so windows
+    reaching back before the new days are complete.
+    """
+    if timeseries_data.empty:
+        return compute_timeseries_rollups(timeseries_data)
+
+    history = local_store.get(TIMESERIES_HISTORY_NAMESPACE, channel_name)
+    history_data = pd.DataFrame(history or {}, columns=timeseries_data.columns)
+    history_data["date"] = pd.to_datetime(history_data["date"])
+
+    combined = pd.concat([history_data, timeseries_data], ignore_index=True)
+    combined = combined.drop_duplicates(subset="date", keep="last")
+
+    with profile_stage("rollup"):
+        rollup_data = compute_timeseries_rollups(
+            combined, since=cast(pd.Timestamp, timeseries_data["date"].min())
+        )
+
+    # Keep just enough days to complete the longest window on the next run
+    last_date = combined["date"].max()
+    history_days = max(ROLLUP_WINDOWS) + TELEGRAM_GRAPH_RECHECK_DAYS
+    history_data = combined.loc[
+        combined["date"] > last_date - pd.Timedelta(history_days, "D")
+    ]
+
+    local_store.set(
+        TIMESERIES_HISTORY_NAMESPACE,
+        channel_name,
+        {
+            "date": history_data["date"].dt.strftime("%Y-%m-%d").tolist(),
+            "handle": history_data["handle"].tolist(),
+        }
+        | {
+            column: history_data[column].tolist()
+            for column in ("joined", "mute", "left", "followers")
+        },
+    )
+
+    return rollup_data
+
+
+def save_channel_stats(
+    local_store: "LocalStore",
     state_data: pd.DataFrame,
+    timeseries_data: pd.DataFrame,
 ) -> None:
-    state_data_dict = state_data.to_dict(orient="records")
-    length = len(state_data_dict)
-
-    logger.info("Uploading %s entries of state to Notion", length)
-    for idx, entry in tqdm.tqdm(enumerate(state_data_dict)):
-        date = entry.get("date", None)
-        date_from_timestamp = date.strftime("%Y-%m-%d")
-        date_str = str(date_from_timestamp)
-        handle = entry.get("handle", None)
-
-        logger.info(
-            "%s/%s - Processing date %s for handle %s",
-            idx + 1,
-            length,
-            date,
-            handle,
-        )
-        followers = entry.get("followers", 0)
-        reactions = entry.get("reactions", 0)
-        views = entry.get("views", 0)
-        shares = entry.get("shares", 0)
+    """
+    Keep the processed stats in the local store for the read API.
+    """
+    local_store.save_stats("channel_state", StateRecord.from_frame(state_data))
+    local_store.save_stats(
+        "channel_timeseries", TimeseriesRecord.from_frame(timeseries_data)
+    )
 
-        if date is None or handle is None:
-            logger.error("Date or handle is not set for entry %s", entry)
-            continue
 
-        is_present = await notion_client.is_present(
-            CHANNEL_STATE_DATABASE_ID, handle, date_str
-        )
+def get_graph_watermarks(
+    local_store: "LocalStore",
+    channel_name: str,
+) -> dict[str, str]:
+    """
+    Get the last synced date of each graph of a channel.
+    """
+    return local_store.get(GRAPH_WATERMARK_NAMESPACE, channel_name) or {}
 
-        if is_present:
-            logger.info(
-                "Entry for date %s for handle %s is already present in Notion",
-                date,
-                handle,
-            )
-            continue
-        else:
-            logger.info(
-                "Entry for date %s for handle %s is not present in Notion, adding...",
-                date,
-                handle,
+
+def set_graph_watermarks(
+    local_store: "LocalStore",
+    channel_name: str,
+    watermarks: dict[str, str],
+) -> None:
+    local_store.set(GRAPH_WATERMARK_NAMESPACE, channel_name, watermarks)
+
+
+def is_channel_fresh(
+    local_store: "LocalStore",
+    channel_name: str,
+    fingerprint: dict[str, Any],
+) -> bool:
+    """
+    Check if the stats of a channel are unchanged since its last successful sync.
+    """
+    last_synced = local_store.get(CHANNEL_SYNC_NAMESPACE, channel_name)
+    if last_synced is None:
+        return False
+
+    return last_synced == fingerprint
+
+
+def mark_channel_synced(
+    local_store: "LocalStore",
+    channel_name: str,
+    fingerprint: dict[str, Any],
+) -> None:
+    """
+    Remember the stats of a channel once they were uploaded to Notion.
+    """
+    local_store.set(CHANNEL_SYNC_NAMESPACE, channel_name, fingerprint)
+
+
+async def upload_records_to_notion[T: DatedRecord](
+    notion_client: "NotionClient",
+    kind: str,
+    database_id: str,
+    record_type: type[T],
+    data: pd.DataFrame,
+    format_record: Callable[[T], dict[str, Any]],
+) -> None:
+    """
+    Upload the rows of a DataFrame as pages, skipping handle and date pairs that
+    are already in the database.
+    """
+    records = record_type.from_frame(data)
+
+    logger.info("Uploading %s entries of %s to Notion", len(records), kind)
+    added = present = 0
+
+    missing_records: list[T] = []
+    with profile_stage("dedupe"):
+        for record in tqdm.tqdm(records):
+            is_present = await notion_client.is_present(
+                database_id, record.handle, record.date
             )
 
-        formated_body = process_state_data(
-            date_str, handle, followers, reactions, views, shares
-        )
-        await notion_client.add_database_entry(CHANNEL_STATE_DATABASE_ID, formated_body)
+            if is_present:
+                present += 1
+            else:
+                missing_records.append(record)
+
+    with profile_stage("upload"):
+        for record in tqdm.tqdm(missing_records):
+            await notion_client.add_database_entry(database_id, format_record(record))
+            added += 1
+
+    log_upload_summary(kind, data, added, present)
 
-    logger.info("State data uploaded to Notion")
+
+async def upload_state_data_to_notion(
+    notion_client: "NotionClient",
+    state_data: pd.DataFrame,
+) -> None:
+    await upload_records_to_notion(
+        notion_client,
+        "state",
+        CHANNEL_STATE_DATABASE_ID,
+        StateRecord,
+        state_data,
+        lambda record: process_state_data(
+            record.date,
+            record.handle,
+            record.followers,
+            record.reactions,
+            record.views,
+            record.shares,
+        ),
+    )
 
 
 async def upload_timeseries_data_to_notion(
     notion_client: "NotionClient",
     timeseries_data: pd.DataFrame,
 ) -> None:
-    timeseries_data_dict = timeseries_data.to_dict(orient="records")
-    length = len(timeseries_data_dict)
-
-    logger.info("Uploading %s entries of timeseries to Notion", length)
-    for idx, entry in tqdm.tqdm(enumerate(timeseries_data_dict)):
-        date = entry.get("date", None)
-        date_from_timestamp = date.strftime("%Y-%m-%d")
-        date_str = str(date_from_timestamp)
-        handle = entry.get("handle", None)
-
-        logger.info(
-            "%s/%s - Processing date %s for handle %s",
-            idx + 1,
-            length,
-            date,
-            handle,
+    await upload_records_to_notion(
+        notion_client,
+        "timeseries",
+        CHANNEL_TIMESERIES_DATABASE_ID,
+        TimeseriesRecord,
+        timeseries_data,
+        lambda record: process_timeseries_data(
+            record.date,
+            record.handle,
+            record.joined,
+            record.mute,
+            record.left,
+            record.followers,
+        ),
+    )
+
+
+async def upload_rollup_data_to_notion(
+    notion_client: "NotionClient",
+    rollup_data: pd.DataFrame,
+) -> None:
+    if not CHANNEL_ROLLUP_DATABASE_ID:
+        logger.debug("Rollup database is not set, skipping rollup upload")
+        return
+
+    await upload_records_to_notion(
+        notion_client,
+        "rollups",
+        CHANNEL_ROLLUP_DATABASE_ID,
+        RollupRecord,
+        rollup_data,
+        lambda record: process_rollup_data(
+            record.date,
+            record.handle,
+            {metric: getattr(record, metric) for metric in get_rollup_columns()},
+        ),
+    )
+
+
+async def upload_post_data_to_notion(
+    notion_client: "NotionClient",
+    channel_name: str,
+    post_records: list[PostRecord],
+) -> None:
+    logger.info("Uploading %s entries of posts to Notion", len(post_records))
+    added = present = 0
+
+    with profile_stage("dedupe"):
+        present_ids = await notion_client.get_present_message_ids(
+            CHANNEL_POSTS_DATABASE_ID,
+            channel_name,
+            [record.message_id for record in post_records],
         )
+        missing_records = [
+            record for record in post_records if record.message_id not in present_ids
+        ]
+        present = len(post_records) - len(missing_records)
+
+    with profile_stage("upload"):
+        for record in tqdm.tqdm(missing_records):
+            formated_body = process_post_data(
+                record.date,
+                record.handle,
+                record.message_id,
+                record.views,
+                record.forwards,
+                record.reactions,
+            )
+            await notion_client.add_database_entry(
+                CHANNEL_POSTS_DATABASE_ID, formated_body
+            )
+            added += 1
+
+    logger.info(
+        "Uploaded posts to Notion for %s: %s added, %s already present",
+        channel_name,
+        added,
+        present,
+    )
+
+
+def log_upload_summary(kind: str, data: pd.DataFrame, added: int, present: int) -> None:
+    """
+    Log one line per upload instead of one per row.
+    """
+    handles = data["handle"].unique().tolist() if "handle" in data else []
 
-        joined = entry.get("joined", 0)
-        mute = entry.get("mute", 0)
-        left = entry.get("left", 0)
-        followers = entry.get("followers", 0)
+    logger.info(
+        "Uploaded %s to Notion for %s: %s added, %s already present",
+        kind,
+        ", ".join(str(handle) for handle in handles) or "no channel",
+        added,
+        present,
+    )
 
-        if date is None or handle is None:
-            logger.error("Date or handle is not set for entry %s", entry)
-            continue
 
-        is_present = await notion_client.is_present(
-            CHANNEL_TIMESERIES_DATABASE_ID, handle, date_str
+async def sync_telegram_channel(
+    telegram_client: "TelegramUserClient",
+    notion_client: "NotionClient",
+    local_store: "LocalStore",
+    channel_name: str,
+) -> bool:
+    """
+    Fetch, process and upload the stats of a channel.
+
+    Returns False if the stats did not change since the last sync and the
+    channel was skipped.
+    """
+    logger.info("Processing channel %s", channel_name)
+    profile_channel(channel_name)
+
+    with profile_stage("fetch"):
+        telegram_stats = await telegram_client.get_stats(channel_name)
+
+    with profile_stage("extract"):
+        telegram_stats_dict = telegram_stats.to_dict()
+        fingerprint = get_stats_fingerprint(
+            telegram_stats_dict, include_posts=bool(CHANNEL_POSTS_DATABASE_ID)
         )
 
-        if is_present:
-            logger.debug(
-                "Entry for date %s for handle %s is already present in Notion",
-                date,
-                handle,
-            )
-            continue
-        else:
-            logger.debug(
-                "Entry for date %s for handle %s is not present in Notion, adding...",
-                date,
-                handle,
+    if is_channel_fresh(local_store, channel_name, fingerprint):
+        logger.info("No new stats for %s, skipping", channel_name)
+        return False
+
+    channel_state, channel_timeseries, watermarks = process_telegram_stats(
+        telegram_stats_dict,
+        channel_name,
+        get_graph_watermarks(local_store, channel_name),
+    )
+
+    save_channel_stats(local_store, channel_state, channel_timeseries)
+
+    await upload_state_data_to_notion(notion_client, channel_state)
+    await upload_timeseries_data_to_notion(notion_client, channel_timeseries)
+
+    channel_rollups = rollup_timeseries_data(
+        local_store, channel_timeseries, channel_name
+    )
+    await upload_rollup_data_to_notion(notion_client, channel_rollups)
+
+    if CHANNEL_POSTS_DATABASE_ID:
+        with profile_stage("posts"):
+            post_records = await telegram_client.get_post_records(
+                channel_name, telegram_stats
             )
+        await upload_post_data_to_notion(notion_client, channel_name, post_records)
 
-        formated_body = process_timeseries_data(
-            date_str, handle, joined, mute, left, followers
-        )
-        await notion_client.add_database_entry(
-            CHANNEL_TIMESERIES_DATABASE_ID, formated_body
-        )
+    set_graph_watermarks(local_store, channel_name, watermarks)
+    mark_channel_synced(local_store, channel_name, fingerprint)
 
+    return True
 
-async def orchestrate():
-    telegram_client = TelegramUserClient()
-    notion_client = NotionClient()
 
-    channels_to_process = await notion_client.get_channels_to_parse()
+async def sync_leased_telegram_channel(
+    lease_store: "LeaseStore",
+    telegram_client: "TelegramUserClient",
+    notion_client: "NotionClient",
+    local_store: "LocalStore",
+    channel_name: str,
+) -> bool | None:
+    """
+    Sync a channel if no other worker holds it, returns None if it was skipped.
+
+    The lease is renewed while the channel is processed. It is released on
+    failure so another worker can retry the channel. If the lease is lost the
+    sync is cancelled, as another worker may have claimed the channel.
+    """
+    if not lease_store.claim(channel_name):
+        return None
+
+    sync_task = asyncio.create_task(
+        sync_telegram_channel(telegram_client, notion_client, local_store, channel_name)
+    )
+    is_lease_lost = False
+
+    async def renew_lease() -> None:
+        nonlocal is_lease_lost
+
+        while True:
+            await asyncio.sleep(LEASE_RENEW_INTERVAL_SECONDS)
+            try:
+                is_renewed = lease_store.renew(channel_name)
+            except Exception as e:
+                logger.error("Error renewing the lease on %s: %s", channel_name, e)
+                is_renewed = False
+
+            if not is_renewed:
+                is_lease_lost = True
+                sync_task.cancel()
+                return
+
+    renew_task = asyncio.create_task(renew_lease())
+
+    try:
+        is_synced = await sync_task
+    except asyncio.CancelledError:
+        lease_store.release(channel_name)
+        if not is_lease_lost:
+            raise
+
+        logger.warning("Lost the lease on %s, stopped syncing it", channel_name)
+        return None
+    except BaseException:
+        lease_store.release(channel_name)
+        raise
+    finally:
+        renew_task.cancel()
+
+    lease_store.complete(channel_name)
+
+    return is_synced
+
+
+async def orchestrate():
+    from src.notion.notion_client import NotionClient
+    from src.shared.local_store import LocalStore
+    from src.telegram.telegram_client import TelegramUserClient
 
-    logger.info("Channels to process: %s", channels_to_process)
+    local_store = LocalStore()
+    telegram_client = TelegramUserClient(local_store=local_store)
+    notion_client = NotionClient()
 
-    for channel_name in channels_to_process:
-        logger.info("Processing channel %s", channel_name)
+    try:
+        await notion_client.validate_schemas()
 
-        channel_state, channel_timeseries = await process_telegram_channel(
-            telegram_client, channel_name
+        channels_to_process = await notion_client.get_channels_to_parse()
+        await telegram_client.warm_peer_cache(channels_to_process)
+        channels_to_process = await filter_eligible_channels(
+            telegram_client, local_store, channels_to_process
         )
 
-        await upload_state_data_to_notion(notion_client, channel_state)
-        await upload_timeseries_data_to_notion(notion_client, channel_timeseries)
+        logger.info("Channels to process: %s", channels_to_process)
+
+        for channel_name in channels_to_process:
+            await sync_telegram_channel(
+                telegram_client, notion_client, local_store, channel_name
+            )
+    finally:
+        await notion_client.close()
+        local_store.close()
 
     logger.info("All channels processed")
 
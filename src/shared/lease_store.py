@@ -0,0 +1,131 @@
+import logging
+import os
+import socket
+import sqlite3
+import time
+
+from src.shared.shared_constants import (
+    LEASE_COMPLETED_TTL_SECONDS,
+    LEASE_TTL_SECONDS,
+)
+
+logger = logging.getLogger("lease_store")
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseStore:
+    """
+    SQLite backed channel leases shared by the workers of a run
+
+    A worker must claim a channel before processing it. Claims expire unless
+    they are renewed, so channels of a crashed worker are picked up again.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        worker_id: str | None = None,
+        lease_ttl: float = LEASE_TTL_SECONDS,
+        completed_ttl: float = LEASE_COMPLETED_TTL_SECONDS,
+    ) -> None:
+        assert path is not None and isinstance(path, str) and len(path) > 0, (
+            "Lease store path is not set"
+        )
+        assert lease_ttl > 0, "Lease TTL must be a positive number"
+
+        self.path = path
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_ttl = lease_ttl
+        self.completed_ttl = completed_ttl
+
+        # Wait for other workers' writes instead of failing on a locked database
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS leases (
+                channel TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                state TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self.connection.commit()
+
+    def claim(self, channel: str) -> bool:
+        """
+        Claim a channel, returns False if another worker holds it.
+        """
+        now = time.time()
+
+        with self.connection:
+            cursor = self.connection.execute(
+                """
+                INSERT INTO leases (channel, owner, state, expires_at)
+                VALUES (?, ?, 'claimed', ?)
+                ON CONFLICT (channel) DO UPDATE SET
+                    owner = excluded.owner,
+                    state = excluded.state,
+                    expires_at = excluded.expires_at
+                WHERE leases.expires_at <= ?
+                """,
+                (channel, self.worker_id, now + self.lease_ttl, now),
+            )
+
+        is_claimed = cursor.rowcount == 1
+        logger.info(
+            "%s %s by %s",
+            "Claimed" if is_claimed else "Could not claim",
+            channel,
+            self.worker_id,
+        )
+
+        return is_claimed
+
+    def renew(self, channel: str) -> bool:
+        """
+        Extend a claim, returns False if the lease was lost.
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                """
+                UPDATE leases SET expires_at = ?
+                WHERE channel = ? AND owner = ? AND state = 'claimed'
+                """,
+                (time.time() + self.lease_ttl, channel, self.worker_id),
+            )
+
+        if cursor.rowcount != 1:
+            logger.warning("Lease on %s was lost by %s", channel, self.worker_id)
+            return False
+
+        return True
+
+    def complete(self, channel: str) -> None:
+        """
+        Keep a processed channel claimed so other workers skip it.
+        """
+        with self.connection:
+            self.connection.execute(
+                """
+                UPDATE leases SET state = 'completed', expires_at = ?
+                WHERE channel = ? AND owner = ?
+                """,
+                (time.time() + self.completed_ttl, channel, self.worker_id),
+            )
+
+    def release(self, channel: str) -> None:
+        """
+        Give up a claim so another worker can process the channel.
+        """
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM leases WHERE channel = ? AND owner = ?",
+                (channel, self.worker_id),
+            )
+
+    def close(self) -> None:
+        self.connection.close()
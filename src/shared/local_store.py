@@ -0,0 +1,214 @@
+import json
+import logging
+import sqlite3
+import time
+from dataclasses import astuple, fields
+from typing import Any
+
+from src.shared.records import StateRecord, TimeseriesRecord
+from src.shared.shared_constants import LOCAL_STORE_PATH
+
+logger = logging.getLogger("local_store")
+
+# Stats tables, keyed by handle and date
+STATS_TABLES: dict[str, type[StateRecord] | type[TimeseriesRecord]] = {
+    "channel_state": StateRecord,
+    "channel_timeseries": TimeseriesRecord,
+}
+
+
+class LocalStore:
+    """
+    SQLite backed key-value store for state kept between runs
+    """
+
+    def __init__(self, path: str = LOCAL_STORE_PATH) -> None:
+        assert path is not None and isinstance(path, str) and len(path) > 0, (
+            "Local store path is not set"
+        )
+
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS kv (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        for table, record_type in STATS_TABLES.items():
+            value_columns = ", ".join(
+                f"{field.name} NUMERIC" for field in fields(record_type)[2:]
+            )
+            self.connection.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    handle TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    {value_columns},
+                    PRIMARY KEY (handle, date)
+                ) WITHOUT ROWID
+                """
+            )
+        self.connection.commit()
+
+    def get(self, namespace: str, key: str) -> Any | None:
+        """
+        Get a value, or None if it is missing or expired.
+        """
+        row = self.connection.execute(
+            "SELECT value, expires_at FROM kv WHERE namespace = ? AND key = ?",
+            (namespace, key),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return None
+
+        return json.loads(value)
+
+    def get_many(self, namespace: str) -> dict[str, Any]:
+        """
+        Get all the values of a namespace that have not expired.
+        """
+        rows = self.connection.execute(
+            """
+            SELECT key, value FROM kv
+            WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)
+            """,
+            (namespace, time.time()),
+        ).fetchall()
+
+        return {key: json.loads(value) for key, value in rows}
+
+    def set(
+        self, namespace: str, key: str, value: Any, ttl: float | None = None
+    ) -> None:
+        """
+        Set a value, optionally expiring after `ttl` seconds.
+        """
+        expires_at = time.time() + ttl if ttl is not None else None
+
+        self.connection.execute(
+            """
+            INSERT OR REPLACE INTO kv (namespace, key, value, expires_at)
+            VALUES (?, ?, ?, ?)
+            """,
+            (namespace, key, json.dumps(value), expires_at),
+        )
+        self.connection.commit()
+
+    def delete(self, namespace: str, key: str) -> None:
+        self.connection.execute(
+            "DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+        )
+        self.connection.commit()
+
+    def save_stats(
+        self, table: str, records: list[StateRecord] | list[TimeseriesRecord]
+    ) -> None:
+        """
+        Insert or replace stats records of a table.
+        """
+        assert table in STATS_TABLES, f"Unknown stats table {table}"
+        if not records:
+            return
+
+        names = [field.name for field in fields(STATS_TABLES[table])]
+        placeholders = ", ".join("?" for _ in names)
+
+        self.connection.executemany(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(names)}) "
+            f"VALUES ({placeholders})",
+            (astuple(record) for record in records),
+        )
+        self.connection.commit()
+
+    def query_stats(
+        self,
+        table: str,
+        handle: str,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Get the stats of a channel between two dates (YYYY-MM-DD, inclusive).
+        """
+        assert table in STATS_TABLES, f"Unknown stats table {table}"
+
+        cursor = self.connection.execute(
+            f"""
+            SELECT * FROM {table}
+            WHERE handle = ? AND date >= ? AND date <= ?
+            ORDER BY date
+            """,
+            (handle, start or "", end or "9999-12-31"),
+        )
+        names = [column[0] for column in cursor.description]
+
+        return [dict(zip(names, row, strict=True)) for row in cursor]
+
+    def aggregate_timeseries(
+        self,
+        handle: str,
+        start: str | None = None,
+        end: str | None = None,
+    ) -> dict[str, Any]:
+        """
+        Summarize the timeseries of a channel between two dates (inclusive).
+        """
+        cursor = self.connection.execute(
+            """
+            SELECT
+                COUNT(*) AS days,
+                MIN(date) AS first_date,
+                MAX(date) AS last_date,
+                SUM(joined) AS joined,
+                SUM(left) AS left,
+                SUM(joined) - SUM(left) AS net_growth,
+                SUM(mute) AS mute,
+                AVG(joined) AS avg_joined,
+                AVG(left) AS avg_left,
+                MIN(followers) AS min_followers,
+                MAX(followers) AS max_followers
+            FROM channel_timeseries
+            WHERE handle = ? AND date >= ? AND date <= ?
+            """,
+            (handle, start or "", end or "9999-12-31"),
+        )
+        names = [column[0] for column in cursor.description]
+        summary = dict(zip(names, cursor.fetchone(), strict=True))
+
+        joined, left = summary["joined"], summary["left"]
+        summary["churn_rate"] = left / joined if joined else None
+
+        return summary
+
+    def list_channels(self) -> list[dict[str, Any]]:
+        """
+        Get the handles with stored timeseries and their date range.
+        """
+        cursor = self.connection.execute(
+            """
+            SELECT handle, MIN(date), MAX(date), COUNT(*)
+            FROM channel_timeseries
+            GROUP BY handle
+            ORDER BY handle
+            """
+        )
+
+        return [
+            {"handle": handle, "first_date": first, "last_date": last, "days": days}
+            for handle, first, last, days in cursor
+        ]
+
+    def close(self) -> None:
+        self.connection.close()
@@ -1,4 +1,10 @@
+import atexit
+import copy
+import json
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
 
 import colorlog
 
@@ -11,7 +17,41 @@ LOG_COLORS = {
 }
 
 
-def configure_logging(level: str = "DEBUG") -> None:
+class JsonFormatter(logging.Formatter):
+    """
+    Format log records as one JSON object per line.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "level": record.levelname,
+            "time": self.formatTime(record, self.datefmt),
+            "logger": record.name,
+            "function": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+
+class LoopQueueHandler(QueueHandler):
+    """
+    Queue handler that only merges the message arguments, formatting is left to
+    the handlers of the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def configure_logging(level: str = "DEBUG", json_output: bool = False) -> None:
     assert level is not None and isinstance(level, str) and len(level) > 0, (
         "Level is not set"
     )
@@ -24,18 +64,30 @@ def configure_logging(level: str = "DEBUG") -> None:
     log_format = "%(log_color)s%(levelname)-8s%(reset)s | %(asctime)s | %(name)s:%(funcName)s:%(lineno)d | %(message)s"  # noqa: E501
     date_format = "%Y-%m-%d %H:%M:%S"
 
-    formatter = colorlog.ColoredFormatter(
-        fmt=log_format,
-        datefmt=date_format,
-        reset=True,
-        log_colors=LOG_COLORS,
-        secondary_log_colors={},
-        style="%",
-    )
+    if json_output:
+        formatter = JsonFormatter(datefmt=date_format)
+    else:
+        formatter = colorlog.ColoredFormatter(
+            fmt=log_format,
+            datefmt=date_format,
+            reset=True,
+            log_colors=LOG_COLORS,
+            secondary_log_colors={},
+            style="%",
+        )
     console_handler.setFormatter(formatter)
 
+    # Records are only queued on the event loop thread, writing them to the
+    # console happens on the listener thread
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_listener = QueueListener(
+        log_queue, console_handler, respect_handler_level=True
+    )
+    queue_listener.start()
+    atexit.register(queue_listener.stop)
+
     handlers = [
-        console_handler,
+        LoopQueueHandler(log_queue),
     ]
 
     logging.getLogger("pyrogram").setLevel(logging.INFO)
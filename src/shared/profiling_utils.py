@@ -0,0 +1,358 @@
+import contextlib
+import fnmatch
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from types import FrameType
+
+from src.shared.shared_constants import (
+    PROFILE_MIN_CPU_SHARE,
+    PROFILE_MODES,
+    PROFILE_OUTPUT_DIR,
+    PROFILE_SAMPLING_INTERVAL_SECONDS,
+    PROFILE_TOP_ENTRIES,
+)
+
+logger = logging.getLogger("profiling_utils")
+
+NO_CHANNEL = "_run"
+
+# Leaf frames of an event loop waiting for IO, with the loop implemented in C
+# (uvloop) the runner itself is the leaf
+IDLE_FRAMES = (
+    ("select", "selectors.py"),
+    ("run", "runners.py"),
+    ("run_forever", "base_events.py"),
+    ("run_until_complete", "base_events.py"),
+)
+
+
+@dataclass(slots=True)
+class StageStats:
+    wall_seconds: float = 0.0
+    calls: int = 0
+    samples: int = 0
+    own_samples: Counter[str] = field(default_factory=Counter)
+    total_samples: Counter[str] = field(default_factory=Counter)
+    allocated_bytes: int = 0
+    peak_bytes: int = 0
+    allocations: Counter[str] = field(default_factory=Counter)
+
+
+# Leave out the allocations of the profiler and of the snapshot filtering itself
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, fnmatch.__file__),
+)
+
+
+class StageProfiler:
+    """
+    Sampling CPU or tracemalloc allocation profiler, attributing everything to
+    the channel and pipeline stage being processed.
+
+    In `cpu` mode, a background thread samples the stack of the profiled thread
+    every `interval` seconds. Samples taken while the thread was idle (waiting on
+    the event loop) are dropped, using its CPU clock where the platform has one
+    and the leaf frame otherwise. In `memory` mode, allocations are diffed between
+    tracemalloc snapshots taken when a stage starts and ends. Tracing allocations
+    slows down every allocation, so the two modes never run together.
+    """
+
+    def __init__(
+        self,
+        mode: str = "cpu",
+        output_dir: str = PROFILE_OUTPUT_DIR,
+        interval: float = PROFILE_SAMPLING_INTERVAL_SECONDS,
+    ) -> None:
+        assert mode in PROFILE_MODES, f"Profile mode must be one of {PROFILE_MODES}"
+        assert interval > 0, "Sampling interval must be a positive number"
+
+        self.mode = mode
+        self.output_dir = output_dir
+        self.interval = interval
+        self.channel = NO_CHANNEL
+        self.current_stage: str | None = None
+        self.stats: dict[str, dict[str, StageStats]] = {}
+
+        self._thread_id = threading.get_ident()
+        self._cpu_clock = _thread_cpu_clock(self._thread_id)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._sampler = threading.Thread(
+            target=self._sample, name="stage-profiler", daemon=True
+        )
+
+    def start(self) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.mode == "memory":
+            tracemalloc.start()
+            # Compile the snapshot filter patterns before the first stage, so
+            # their regex caches are not reported as allocations of that stage
+            for snapshot_filter in SNAPSHOT_FILTERS:
+                fnmatch.fnmatch("", snapshot_filter.filename_pattern)
+        else:
+            self._sampler.start()
+        logger.info("Profiling %s to %s", self.mode, self.output_dir)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._sampler.is_alive():
+            self._sampler.join()
+        tracemalloc.stop()
+
+        # Nothing was profiled if starting failed
+        if not self.stats:
+            return
+
+        self.write_channel_report(self.channel)
+        self.write_summary()
+
+    def set_channel(self, channel: str) -> None:
+        if channel == self.channel:
+            return
+
+        with self._lock:
+            previous_channel = self.channel
+            self.channel = channel
+
+        self.write_channel_report(previous_channel)
+
+    def _stage_stats(self, stage: str) -> StageStats:
+        return self.stats.setdefault(self.channel, {}).setdefault(stage, StageStats())
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        with self._lock:
+            stats = self._stage_stats(name)
+        previous_stage = self.current_stage
+
+        before = None
+        if self.mode == "memory":
+            tracemalloc.reset_peak()
+            before = _take_snapshot()
+        started = time.perf_counter()
+        self.current_stage = name
+
+        try:
+            yield
+        finally:
+            self.current_stage = previous_stage
+            stats.wall_seconds += time.perf_counter() - started
+            stats.calls += 1
+
+            if before is not None:
+                self._record_allocations(stats, before)
+
+    def _record_allocations(
+        self, stats: StageStats, before: tracemalloc.Snapshot
+    ) -> None:
+        _, peak = tracemalloc.get_traced_memory()
+        stats.peak_bytes = max(stats.peak_bytes, peak)
+
+        after = _take_snapshot()
+        diffs = after.compare_to(before, "lineno")
+
+        with self._lock:
+            for diff in diffs:
+                if diff.size_diff > 0:
+                    stats.allocated_bytes += diff.size_diff
+                    stats.allocations[str(diff.traceback[0])] += diff.size_diff
+
+    def _sample(self) -> None:
+        min_cpu = self.interval * PROFILE_MIN_CPU_SHARE
+        last_cpu = self._cpu_time()
+
+        while not self._stop_event.wait(self.interval):
+            cpu = self._cpu_time()
+            cpu_delta = None if cpu is None or last_cpu is None else cpu - last_cpu
+            last_cpu = cpu
+
+            stage = self.current_stage
+            if stage is None:
+                continue
+
+            if cpu_delta is not None and cpu_delta < min_cpu:
+                continue
+
+            frame = sys._current_frames().get(self._thread_id, None)
+            if frame is None or _is_idle_frame(frame):
+                continue
+
+            leaf = f"{_frame_name(frame)}:{frame.f_lineno}"
+            stack = _stack_names(frame)
+
+            with self._lock:
+                stats = self._stage_stats(stage)
+                stats.samples += 1
+                stats.own_samples[leaf] += 1
+                stats.total_samples.update(stack)
+
+    def _cpu_time(self) -> float | None:
+        if self._cpu_clock is None:
+            return None
+        return time.clock_gettime(self._cpu_clock)
+
+    def write_channel_report(self, channel: str) -> None:
+        with self._lock:
+            stages = self.stats.get(channel, None)
+            if not stages:
+                return
+
+            lines = [f"Profile ({self.mode}) for {channel}", ""]
+            for stage, stats in stages.items():
+                lines += _format_stage(stage, stats, self.mode)
+
+        path = os.path.join(self.output_dir, f"{_safe_name(channel)}.txt")
+        with open(path, "w") as report:
+            report.write("\n".join(lines))
+
+    def write_summary(self) -> None:
+        totals: dict[str, StageStats] = {}
+        channel_times: Counter[str] = Counter()
+
+        for channel, stages in self.stats.items():
+            for stage, stats in stages.items():
+                total = totals.setdefault(stage, StageStats())
+                total.wall_seconds += stats.wall_seconds
+                total.calls += stats.calls
+                total.samples += stats.samples
+                total.own_samples.update(stats.own_samples)
+                total.total_samples.update(stats.total_samples)
+                total.allocated_bytes += stats.allocated_bytes
+                total.peak_bytes = max(total.peak_bytes, stats.peak_bytes)
+                total.allocations.update(stats.allocations)
+                channel_times[channel] += stats.wall_seconds
+
+        lines = ["Slowest channels", ""]
+        lines += [
+            f"  {seconds:10.3f}s  {channel}"
+            for channel, seconds in channel_times.most_common(PROFILE_TOP_ENTRIES)
+        ]
+        lines.append("")
+
+        for stage, stats in totals.items():
+            lines += _format_stage(stage, stats, self.mode)
+
+        path = os.path.join(self.output_dir, "summary.txt")
+        with open(path, "w") as report:
+            report.write("\n".join(lines))
+
+        logger.warning("Profile summary written to %s", path)
+
+
+def _frame_name(frame: FrameType) -> str:
+    return f"{frame.f_code.co_qualname} {frame.f_code.co_filename}"
+
+
+def _thread_cpu_clock(thread_id: int) -> int | None:
+    getcpuclockid = getattr(time, "pthread_getcpuclockid", None)
+    if getcpuclockid is None:
+        return None
+
+    try:
+        return getcpuclockid(thread_id)
+    except OSError:
+        return None
+
+
+def _is_idle_frame(frame: FrameType) -> bool:
+    name = frame.f_code.co_name
+    filename = os.path.basename(frame.f_code.co_filename)
+    return (name, filename) in IDLE_FRAMES
+
+
+def _stack_names(frame: FrameType | None) -> set[str]:
+    names: set[str] = set()
+    while frame is not None:
+        names.add(_frame_name(frame))
+        frame = frame.f_back
+    return names
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+
+def _format_stage(stage: str, stats: StageStats, mode: str) -> list[str]:
+    header = f"== {stage}: {stats.wall_seconds:.3f}s over {stats.calls} calls, "
+
+    if mode == "memory":
+        lines = [
+            header + f"{stats.allocated_bytes / 1024:.1f} KiB allocated, "
+            f"{stats.peak_bytes / 1024:.1f} KiB peak",
+            "-- Allocations",
+        ]
+        lines += [
+            f"  {size / 1024:8.1f} KiB  {location}"
+            for location, size in stats.allocations.most_common(PROFILE_TOP_ENTRIES)
+        ]
+        lines.append("")
+        return lines
+
+    lines = [header + f"{stats.samples} samples", "-- CPU, own samples"]
+    lines += [
+        f"  {count:8d}  {name}"
+        for name, count in stats.own_samples.most_common(PROFILE_TOP_ENTRIES)
+    ]
+    lines.append("-- CPU, total samples")
+    lines += [
+        f"  {count:8d}  {name}"
+        for name, count in stats.total_samples.most_common(PROFILE_TOP_ENTRIES)
+    ]
+    lines.append("")
+    return lines
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+
+_profiler: StageProfiler | None = None
+_no_stage = contextlib.nullcontext()
+
+
+def start_profiling(
+    mode: str = "cpu",
+    output_dir: str = PROFILE_OUTPUT_DIR,
+    interval: float = PROFILE_SAMPLING_INTERVAL_SECONDS,
+) -> None:
+    global _profiler
+    assert _profiler is None, "Profiling is already started"
+
+    _profiler = StageProfiler(mode, output_dir, interval)
+    _profiler.start()
+
+
+def stop_profiling() -> None:
+    global _profiler
+    if _profiler is None:
+        return
+
+    _profiler.stop()
+    _profiler = None
+
+
+def profile_channel(channel: str) -> None:
+    """
+    Attribute the following stages to a channel.
+    """
+    if _profiler is not None:
+        _profiler.set_channel(channel)
+
+
+def profile_stage(name: str) -> contextlib.AbstractContextManager[None]:
+    """
+    Attribute the enclosed code to a pipeline stage, a no-op unless profiling.
+    """
+    if _profiler is None:
+        return _no_stage
+    return _profiler.stage(name)
@@ -0,0 +1,160 @@
+import bisect
+import logging
+from dataclasses import dataclass, fields
+from typing import TYPE_CHECKING, Any, Protocol, Self, cast
+
+import pandas as pd
+
+if TYPE_CHECKING:
+    from _typeshed import DataclassInstance
+
+logger = logging.getLogger("records")
+
+
+class DatedRecord(Protocol):
+    """
+    A record of one channel on one day, built from a DataFrame
+    """
+
+    @property
+    def date(self) -> str: ...
+
+    @property
+    def handle(self) -> str: ...
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame) -> list[Self]: ...
+
+
+@dataclass(slots=True, frozen=True)
+class GraphSeries:
+    """
+    Days of a StatsGraph, stored column-wise
+    """
+
+    dates: list[str]
+    columns: dict[str, list[Any]]
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({"date": pd.to_datetime(self.dates), **self.columns})
+
+    def until(self, date: str) -> "GraphSeries":
+        """
+        Days up to and including `date` (YYYY-MM-DD)
+        """
+        end = bisect.bisect_right(self.dates, date)
+        return GraphSeries(
+            dates=self.dates[:end],
+            columns={name: values[:end] for name, values in self.columns.items()},
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class AbsValueAndPrev:
+    """
+    Current value of a channel metric and its value 7 days before
+    """
+
+    date: str
+    current: float
+    previous_date: str
+    previous: float
+
+
+@dataclass(slots=True, frozen=True)
+class StateRecord:
+    date: str
+    handle: str
+    followers: float
+    reactions: float
+    views: float
+    shares: float
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame) -> list[Self]:
+        return records_from_frame(cls, data)
+
+
+@dataclass(slots=True, frozen=True)
+class TimeseriesRecord:
+    date: str
+    handle: str
+    joined: int
+    mute: int
+    left: int
+    followers: int
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame) -> list[Self]:
+        return records_from_frame(cls, data, dtype="int64")
+
+
+@dataclass(slots=True, frozen=True)
+class RollupRecord:
+    date: str
+    handle: str
+    net_growth_7d: float | None
+    churn_rate_7d: float | None
+    mute_ratio_7d: float | None
+    net_growth_30d: float | None
+    churn_rate_30d: float | None
+    mute_ratio_30d: float | None
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame) -> list[Self]:
+        return records_from_frame(cls, data, fill_missing=False)
+
+
+@dataclass(slots=True, frozen=True)
+class PostRecord:
+    date: str
+    handle: str
+    message_id: int
+    views: int
+    forwards: int
+    reactions: int
+
+
+def records_from_frame[T: "DataclassInstance"](
+    record_type: type[T],
+    data: pd.DataFrame,
+    dtype: str = "float64",
+    fill_missing: bool = True,
+) -> list[T]:
+    """
+    Build records from a DataFrame with a `date` column, a `handle` column and
+    one numeric column per remaining record field.
+
+    Missing columns raise a KeyError, rows without a date or handle are dropped.
+    Missing values become 0, or None if `fill_missing` is False.
+    """
+    names = [field.name for field in fields(record_type)]
+    assert names[:2] == ["date", "handle"], "Record must start with date and handle"
+
+    invalid = data["date"].isna() | data["handle"].isna()
+    if invalid.any():
+        logger.error(
+            "Date or handle is not set for %s entries, skipping them", invalid.sum()
+        )
+        data = data.loc[~invalid]
+
+    if data.empty:
+        return []
+
+    columns: list[list[Any]] = [
+        pd.to_datetime(data["date"]).dt.strftime("%Y-%m-%d").tolist(),
+        data["handle"].astype(str).tolist(),
+    ]
+    for name in names[2:]:
+        # Metrics missing from a response come as all-None object columns
+        values = cast(pd.Series, pd.to_numeric(data[name]))
+        if fill_missing:
+            columns.append(values.fillna(0).astype(dtype).tolist())
+        else:
+            values = values.astype(dtype)
+            columns.append(values.astype(object).where(values.notna(), None).tolist())
+
+    return [record_type(*row) for row in zip(*columns, strict=True)]
@@ -0,0 +1,65 @@
+import pandas as pd
+
+from src.shared.shared_constants import ROLLUP_WINDOWS
+
+ROLLUP_SOURCE_COLUMNS = ["joined", "left", "mute"]
+
+
+def get_rollup_columns(windows: tuple[int, ...] = ROLLUP_WINDOWS) -> list[str]:
+    return [
+        f"{metric}_{window}d"
+        for window in windows
+        for metric in ("net_growth", "churn_rate", "mute_ratio")
+    ]
+
+
+def compute_timeseries_rollups(
+    timeseries_data: pd.DataFrame,
+    since: pd.Timestamp | None = None,
+    windows: tuple[int, ...] = ROLLUP_WINDOWS,
+) -> pd.DataFrame:
+    """
+    Compute rolling window summaries of daily timeseries rows of one channel.
+
+    For each window size, per window end date:
+    - net growth: joined - left
+    - churn rate: left / joined
+    - mute ratio: muted / followers at the end of the window
+
+    Only windows ending on or after `since` are returned, windows without a full
+    set of days are left empty.
+    """
+    columns = ["date", "handle", *get_rollup_columns(windows)]
+
+    if timeseries_data.empty:
+        return pd.DataFrame(columns=columns)
+
+    handle = timeseries_data["handle"].iloc[0]
+    daily = timeseries_data.sort_values("date").set_index("date")
+    followers = daily["followers"].where(daily["followers"] > 0)
+
+    rollups = pd.DataFrame(index=daily.index)
+
+    for window in windows:
+        rolling = daily[ROLLUP_SOURCE_COLUMNS].rolling(f"{window}D")
+        sums = rolling.sum()
+        is_complete = rolling.count()["joined"] >= window
+
+        joined = sums["joined"].where(sums["joined"] > 0)
+
+        rollups[f"net_growth_{window}d"] = (sums["joined"] - sums["left"]).where(
+            is_complete
+        )
+        rollups[f"churn_rate_{window}d"] = (sums["left"] / joined).where(is_complete)
+        rollups[f"mute_ratio_{window}d"] = (sums["mute"] / followers).where(is_complete)
+
+    if since is not None:
+        rollups = rollups[rollups.index >= since]
+
+    # Days without even the shortest full window carry no information
+    rollups = rollups.dropna(subset=[f"net_growth_{min(windows)}d"])
+
+    rollups = rollups.reset_index()
+    rollups.insert(1, "handle", handle)
+
+    return rollups[columns]
@@ -0,0 +1,26 @@
+# --- Local Store ---
+LOCAL_STORE_PATH = "stratosphere_state.db"
+
+# --- Channel Sync State ---
+CHANNEL_SYNC_NAMESPACE = "channel_sync"
+GRAPH_WATERMARK_NAMESPACE = "graph_watermarks"
+
+# --- Rollups ---
+ROLLUP_WINDOWS = (7, 30)
+TIMESERIES_HISTORY_NAMESPACE = "timeseries_history"
+
+# --- Profiling ---
+PROFILE_OUTPUT_DIR = "profiles"
+# tracemalloc hooks every allocation and would skew CPU samples, so CPU and
+# memory are profiled in separate runs
+PROFILE_MODES = ("cpu", "memory")
+PROFILE_SAMPLING_INTERVAL_SECONDS = 0.005
+PROFILE_TOP_ENTRIES = 15
+# Samples where the thread used less CPU than this share of the interval are idle
+PROFILE_MIN_CPU_SHARE = 0.5
+
+# --- Worker Leases ---
+LEASE_TTL_SECONDS = 5 * 60
+LEASE_RENEW_INTERVAL_SECONDS = 60
+# Completed channels stay claimed so other workers of the same run skip them
+LEASE_COMPLETED_TTL_SECONDS = 6 * 60 * 60
@@ -1,16 +1,44 @@
 import logging
 import os
-from typing import cast
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Any, cast
 
 from dotenv import load_dotenv
 from telethon import TelegramClient
-from telethon.tl.types import InputPeerUser, User
+from telethon.errors import (
+    ChannelInvalidError,
+    ChannelPrivateError,
+    FloodError,
+    PeerIdInvalidError,
+)
+from telethon.tl.functions.channels import GetFullChannelRequest
+from telethon.tl.types import (
+    Channel,
+    ChannelFull,
+    InputPeerChannel,
+    InputPeerUser,
+    PostInteractionCountersMessage,
+    User,
+)
+from telethon.tl.types.messages import ChatFull
 from telethon.tl.types.stats import BroadcastStats, MegagroupStats
+from telethon.utils import get_input_peer
 
-from src.telegram.telegram_constants import TELEGRAM_SESSION_NAME
+from src.shared.records import PostRecord
+from src.telegram.telegram_constants import (
+    TELEGRAM_MEGAGROUP_STATS_MIN_MEMBERS,
+    TELEGRAM_PEER_CACHE_NAMESPACE,
+    TELEGRAM_SESSION_NAME,
+)
+
+if TYPE_CHECKING:
+    from src.shared.local_store import LocalStore
 
 logger = logging.getLogger("telegram_client")
 
+# Errors meaning a cached channel id/access hash no longer points to the channel
+STALE_PEER_ERRORS = (ChannelInvalidError, ChannelPrivateError, PeerIdInvalidError)
+
 load_dotenv()
 
 
@@ -19,7 +47,11 @@ class TelegramUserClient:
     Telegram user client
     """
 
-    def __init__(self, session_name: str = TELEGRAM_SESSION_NAME) -> None:
+    def __init__(
+        self,
+        session_name: str = TELEGRAM_SESSION_NAME,
+        local_store: "LocalStore | None" = None,
+    ) -> None:
         api_id_env = os.getenv("TELEGRAM_API_ID", None)
         api_hash_env = os.getenv("TELEGRAM_API_HASH", None)
 
@@ -43,6 +75,147 @@ class TelegramUserClient:
             api_hash,
         )
 
+        # Persistent handle -> (channel id, access hash) cache, resolving usernames
+        # is one of the most flood limited Telegram methods. Telethon's session
+        # keeps its own copy, so stale peers are re-resolved over the network.
+        self.local_store = local_store
+
+    @staticmethod
+    def _peer_cache_key(channel_name: str) -> str:
+        return channel_name.lstrip("@").lower()
+
+    def _get_cached_peer(self, channel_name: str) -> InputPeerChannel | None:
+        if self.local_store is None:
+            return None
+
+        cached = self.local_store.get(
+            TELEGRAM_PEER_CACHE_NAMESPACE, self._peer_cache_key(channel_name)
+        )
+        if cached is None:
+            return None
+
+        channel_id, access_hash = cached
+        return InputPeerChannel(channel_id=channel_id, access_hash=access_hash)
+
+    def _cache_peer(self, channel_name: str, peer: Any) -> None:
+        if self.local_store is None or not isinstance(peer, InputPeerChannel):
+            return
+
+        self.local_store.set(
+            TELEGRAM_PEER_CACHE_NAMESPACE,
+            self._peer_cache_key(channel_name),
+            [peer.channel_id, peer.access_hash],
+        )
+
+    def _invalidate_peer(self, channel_name: str) -> None:
+        if self.local_store is None:
+            return
+
+        logger.info("Invalidating cached peer for %s", channel_name)
+        self.local_store.delete(
+            TELEGRAM_PEER_CACHE_NAMESPACE, self._peer_cache_key(channel_name)
+        )
+
+    async def _resolve_peer(
+        self, client: TelegramClient, channel_name: str, refresh: bool = False
+    ) -> Any:
+        """
+        Resolve a channel handle to an input peer
+
+        Telethon's session also stores username -> peer and get_input_entity only
+        calls Telegram if the username is not there. With `refresh`, both caches
+        are bypassed and the username is resolved over the network.
+        """
+        if not refresh:
+            cached_peer = self._get_cached_peer(channel_name)
+            if cached_peer is not None:
+                return cached_peer
+
+            logger.info("Resolving username %s", channel_name)
+            peer = await client.get_input_entity(channel_name)
+        else:
+            logger.info("Resolving username %s over the network", channel_name)
+            # get_entity always sends ResolveUsernameRequest for usernames and
+            # updates the session with the result
+            peer = get_input_peer(await client.get_entity(channel_name))
+
+        self._cache_peer(channel_name, peer)
+
+        return peer
+
+    async def _request_with_peer[T](
+        self,
+        client: TelegramClient,
+        channel_name: str,
+        request: Callable[[Any], Awaitable[T]],
+    ) -> T:
+        """
+        Run a request on the channel peer, resolving the username over the network
+        and retrying once if the cached peer went stale.
+        """
+        peer = await self._resolve_peer(client, channel_name)
+
+        try:
+            return await request(peer)
+        except STALE_PEER_ERRORS:
+            self._invalidate_peer(channel_name)
+            peer = await self._resolve_peer(client, channel_name, refresh=True)
+            return await request(peer)
+
+    async def warm_peer_cache(self, channel_names: list[str]) -> None:
+        """
+        Fill the peer cache in bulk from the dialogs of the logged in user
+
+        Only runs if some channels are missing from the cache. Cached handles whose
+        channel now has a different username are invalidated.
+        """
+        assert channel_names is not None, "Channel names are not set"
+        assert self.client is not None, "Client is not initialized"
+        assert isinstance(self.client, TelegramClient), "Client is not a TelegramClient"
+
+        if self.local_store is None:
+            return
+
+        cached = self.local_store.get_many(TELEGRAM_PEER_CACHE_NAMESPACE)
+        missing = {
+            self._peer_cache_key(channel_name)
+            for channel_name in channel_names
+            if self._peer_cache_key(channel_name) not in cached
+        }
+
+        if not missing:
+            logger.info("All %s channels are in the peer cache", len(channel_names))
+            return
+
+        logger.info("Warming peer cache for %s channels from dialogs", len(missing))
+        client = cast(TelegramClient, self.client)
+
+        usernames_by_id: dict[int, set[str]] = {}
+
+        async with client:
+            async for dialog in client.iter_dialogs():
+                entity = dialog.entity
+                if not isinstance(entity, Channel) or entity.access_hash is None:
+                    continue
+
+                usernames = {u.username.lower() for u in entity.usernames or []}
+                if entity.username:
+                    usernames.add(entity.username.lower())
+                usernames_by_id[entity.id] = usernames
+
+                for username in usernames & missing:
+                    self._cache_peer(
+                        username,
+                        InputPeerChannel(
+                            channel_id=entity.id, access_hash=entity.access_hash
+                        ),
+                    )
+
+        for handle, (channel_id, _) in cached.items():
+            usernames = usernames_by_id.get(channel_id, None)
+            if usernames is not None and handle not in usernames:
+                self._invalidate_peer(handle)
+
     async def is_admin(self, channel_name: str) -> bool:
         """
         Check if the logged in user is an admin in a channel
@@ -52,28 +225,151 @@ class TelegramUserClient:
         client = cast(TelegramClient, self.client)
 
         async with client:
-            logger.info("Checking if user is an admin in %s", channel_name)
             user_object = await client.get_me()
             try:
-                permissions = await client.get_permissions(channel_name, user_object)
+                is_admin = await self._is_admin(client, channel_name, user_object)
+                return is_admin is True
+            except FloodError as e:
+                logger.error(
+                    "Error checking if user is an admin in %s: %s",
+                    channel_name,
+                    e,
+                )
+                return False
 
-                is_allowed = permissions is not None and permissions.is_admin
+    async def _is_admin(
+        self,
+        client: TelegramClient,
+        channel_name: str,
+        user_object: User | InputPeerUser,
+    ) -> bool | None:
+        """
+        Returns None if the check failed without a definite answer
+        """
+        logger.info("Checking if user is an admin in %s", channel_name)
+        try:
+            permissions = await self._request_with_peer(
+                client,
+                channel_name,
+                lambda peer: client.get_permissions(peer, user_object),
+            )
 
-                logger.info(
-                    "Logged in user is %s in %s",
-                    "an admin" if is_allowed else "not an admin",
+            is_allowed = permissions is not None and permissions.is_admin
+
+            logger.info(
+                "Logged in user is %s in %s",
+                "an admin" if is_allowed else "not an admin",
+                channel_name,
+            )
+
+            return is_allowed
+        except FloodError:
+            raise
+        except ChannelPrivateError as e:
+            logger.info("Channel %s is private: %s", channel_name, e)
+            return False
+        except STALE_PEER_ERRORS as e:
+            logger.error("Peer for %s is invalid: %s", channel_name, e)
+            self._invalidate_peer(channel_name)
+            return None
+        except Exception as e:
+            logger.error(
+                "Error checking if user is an admin in %s: %s",
+                channel_name,
+                e,
+            )
+            return None
+
+    async def get_stats_eligibility(
+        self, channel_names: list[str]
+    ) -> dict[str, bool | None]:
+        """
+        Check which channels the logged in user can get stats for
+
+        A channel is eligible if the user is an admin there and Telegram allows
+        viewing its stats (eg megagroup has >500 members). Channels that could not
+        be checked (flood limits, network errors) are mapped to None.
+        """
+        assert channel_names is not None, "Channel names are not set"
+        assert self.client is not None, "Client is not initialized"
+        assert isinstance(self.client, TelegramClient), "Client is not a TelegramClient"
+        client = cast(TelegramClient, self.client)
+
+        eligibility: dict[str, bool | None] = {}
+
+        async with client:
+            user_object = await client.get_me()
+
+            for channel_name in channel_names:
+                try:
+                    eligibility[channel_name] = await self._is_stats_eligible(
+                        client, channel_name, user_object
+                    )
+                except FloodError as e:
+                    logger.warning(
+                        "Flood limit while checking %s, leaving it unchecked: %s",
+                        channel_name,
+                        e,
+                    )
+                    eligibility[channel_name] = None
+
+        return eligibility
+
+    async def _is_stats_eligible(
+        self,
+        client: TelegramClient,
+        channel_name: str,
+        user_object: User | InputPeerUser,
+    ) -> bool | None:
+        is_admin = await self._is_admin(client, channel_name, user_object)
+        if not is_admin:
+            return is_admin
+
+        try:
+            full_channel = cast(
+                ChatFull,
+                await self._request_with_peer(
+                    client,
                     channel_name,
-                )
+                    lambda peer: client(GetFullChannelRequest(peer)),
+                ),
+            )
+        except FloodError:
+            raise
+        except ChannelPrivateError as e:
+            logger.info("Channel %s is private: %s", channel_name, e)
+            return False
+        except STALE_PEER_ERRORS as e:
+            logger.error("Peer for %s is invalid: %s", channel_name, e)
+            self._invalidate_peer(channel_name)
+            return None
+        except Exception as e:
+            logger.error("Error getting full channel %s: %s", channel_name, e)
+            return None
 
-                return is_allowed
-            except Exception as e:
-                logger.error(
-                    "Error checking if user is an admin in %s: %s",
+        # GetFullChannelRequest always returns the full info of a channel
+        full_chat = cast(ChannelFull, full_channel.full_chat)
+        channel = next(
+            (chat for chat in full_channel.chats if chat.id == full_chat.id), None
+        )
+
+        if isinstance(channel, Channel) and channel.megagroup:
+            participants_count = full_chat.participants_count or 0
+            if participants_count < TELEGRAM_MEGAGROUP_STATS_MIN_MEMBERS:
+                logger.info(
+                    "Megagroup %s has %s members, stats need at least %s",
                     channel_name,
-                    e,
+                    participants_count,
+                    TELEGRAM_MEGAGROUP_STATS_MIN_MEMBERS,
                 )
                 return False
 
+        if not full_chat.can_view_stats:
+            logger.info("Stats are not available for %s", channel_name)
+            return False
+
+        return True
+
     async def get_me(self) -> User | InputPeerUser:
         """
         Get the current user
@@ -100,28 +396,87 @@ class TelegramUserClient:
 
         async with client:
             try:
-                resolved_channel = await client.get_input_entity(channel_name)
-            except Exception as e:
-                logger.error("Error getting channel stats: %s", e)
-                raise e from None
-
-            try:
-                channel_stats = await client.get_stats(resolved_channel)
-                channel_stats = cast(BroadcastStats | MegagroupStats, channel_stats)
+                channel_stats = await self._request_with_peer(
+                    client,
+                    channel_name,
+                    lambda peer: cast(
+                        Awaitable[BroadcastStats | MegagroupStats],
+                        client.get_stats(peer),
+                    ),
+                )
             except Exception as e:
                 logger.error("Error getting channel stats: %s", e)
                 raise e from None
 
             return channel_stats
 
-    async def process_broadcast_stats(self, broadcast_stats: BroadcastStats) -> None:
+    async def get_post_records(
+        self, channel_name: str, stats: BroadcastStats | MegagroupStats
+    ) -> list[PostRecord]:
+        """
+        Get per post interaction counters from the channel stats
         """
-        Process the channel stats
+        if isinstance(stats, BroadcastStats):
+            return await self.process_broadcast_stats(channel_name, stats)
+
+        return await self.process_megagroup_stats(channel_name, stats)
+
+    async def process_broadcast_stats(
+        self, channel_name: str, broadcast_stats: BroadcastStats
+    ) -> list[PostRecord]:
         """
-        pass
+        Process the recent post interactions of a channel
 
-    async def process_megagroup_stats(self, megagroup_stats: MegagroupStats) -> None:
+        The post dates are not part of the stats, so the messages are fetched by
+        id in bulk (Telethon sends up to 100 ids per request) instead of one
+        request per post.
+        """
+        assert channel_name is not None, "Channel name is not set"
+        assert self.client is not None, "Client is not initialized"
+        assert isinstance(self.client, TelegramClient), "Client is not a TelegramClient"
+        client = cast(TelegramClient, self.client)
+
+        counters = {
+            counter.msg_id: counter
+            for counter in broadcast_stats.recent_posts_interactions or []
+            if isinstance(counter, PostInteractionCountersMessage)
+        }
+
+        if not counters:
+            return []
+
+        async with client:
+            peer = await self._resolve_peer(client, channel_name)
+            messages = await client.get_messages(peer, ids=list(counters))
+
+        post_records: list[PostRecord] = []
+
+        for message in messages:
+            # Deleted posts come back as None
+            if message is None:
+                continue
+
+            counter = counters[message.id]
+            post_records.append(
+                PostRecord(
+                    date=message.date.strftime("%Y-%m-%d"),
+                    handle=channel_name,
+                    message_id=message.id,
+                    views=counter.views,
+                    forwards=counter.forwards,
+                    reactions=counter.reactions,
+                )
+            )
+
+        return post_records
+
+    async def process_megagroup_stats(
+        self, channel_name: str, megagroup_stats: MegagroupStats
+    ) -> list[PostRecord]:
         """
         Process the megagroup stats
+
+        Megagroup stats have no per post counters
         """
-        pass
+        logger.debug("Megagroup %s has no post stats", channel_name)
+        return []
@@ -6,15 +6,21 @@ TELEGRAM_GRAPH_SUPPORTED_KEYS = [
     "mute_graph",
 ]
 
+# Days before the last synced date to parse again, late Telegram updates land there
+TELEGRAM_GRAPH_RECHECK_DAYS = 3
+
 TELEGRAM_DATA_SUPPORTED_KEYS = [
     "followers",
     "views_per_post",
     "shares_per_post",
     "reactions_per_post",
 ]
-TELEGRAM_NAME_MAP = {
-    "followers": "Followers",
-    "views_per_post": "Views per Post",
-    "shares_per_post": "Shares per Post",
-    "reactions_per_post": "Reactions per Post",
-}
+
+# --- Stats Eligibility ---
+TELEGRAM_MEGAGROUP_STATS_MIN_MEMBERS = 500
+TELEGRAM_ELIGIBLE_TTL_SECONDS = 24 * 60 * 60
+TELEGRAM_INELIGIBLE_TTL_SECONDS = 6 * 60 * 60
+TELEGRAM_ELIGIBILITY_NAMESPACE = "stats_eligibility"
+
+# --- Peer Cache ---
+TELEGRAM_PEER_CACHE_NAMESPACE = "telegram_peers"
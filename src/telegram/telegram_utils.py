@@ -1,12 +1,15 @@
+import bisect
+import hashlib
 import json
 import logging
 from datetime import datetime, timedelta
 from typing import Any
 
+from src.shared.records import AbsValueAndPrev, GraphSeries
 from src.telegram.telegram_constants import (
     TELEGRAM_DATA_SUPPORTED_KEYS,
+    TELEGRAM_GRAPH_RECHECK_DAYS,
     TELEGRAM_GRAPH_SUPPORTED_KEYS,
-    TELEGRAM_NAME_MAP,
 )
 
 logger = logging.getLogger("telegram_utils")
@@ -44,13 +47,17 @@ def is_channel_state(key: str, value: dict[str, Any]) -> bool:
         return False
 
 
-def process_graph_data(graph: dict[str, Any]) -> list[dict[str, Any]]:
+def process_graph_data(
+    graph: dict[str, Any],
+    since: str | None = None,
+    recheck_days: int = TELEGRAM_GRAPH_RECHECK_DAYS,
+) -> GraphSeries:
     """
     Extract graph data from telethon response
-    """
-    x_axis_name = "date"
-    entries: list[dict[str, Any]] = []
 
+    If `since` (YYYY-MM-DD) is set, only days after it are extracted, plus the
+    `recheck_days` days before it.
+    """
     graph_json = graph.get("json", None)
     assert graph_json is not None, "Graph JSON is not found"
 
@@ -61,47 +68,78 @@ def process_graph_data(graph: dict[str, Any]) -> list[dict[str, Any]]:
     names = graph_data.get("names", None)
     x_axis = columns[0]
 
-    num_days = len(x_axis)
-    total_entries = len(columns)
-
-    for day in range(1, num_days, 1):
-        daily_entry: dict[str, Any] = {}
-
-        for entry in range(total_entries):
-            if entry == 0:
-                entry_name = x_axis_name
-                value = datetime.fromtimestamp(columns[entry][day] / 1000).strftime(
-                    "%Y-%m-%d"
-                )
-            else:
-                code_name = columns[entry][0]
-                entry_name = names[code_name]
-                value = columns[entry][day]
+    first_day = 1
+    if since is not None:
+        # The x axis is sorted, so skip straight to the first day to extract. The
+        # cutoff is local midnight, matching how the dates are formatted below.
+        cutoff = datetime.strptime(since, "%Y-%m-%d") - timedelta(days=recheck_days)
+        cutoff_timestamp = cutoff.timestamp() * 1000
+        first_day = bisect.bisect_left(x_axis, cutoff_timestamp, lo=1)
 
-            daily_entry[entry_name] = value
+    dates = [
+        datetime.fromtimestamp(timestamp / 1000).strftime("%Y-%m-%d")
+        for timestamp in x_axis[first_day:]
+    ]
+    values = {names[column[0]]: column[first_day:] for column in columns[1:]}
 
-        entries.append(daily_entry)
+    return GraphSeries(dates=dates, columns=values)
 
-    return entries
 
-
-def process_abs_value_and_prev(key: str, value: dict[str, Any]) -> list[dict[str, Any]]:
+def process_abs_value_and_prev(value: dict[str, Any]) -> AbsValueAndPrev:
     today_date = datetime.now().strftime("%Y-%m-%d")
     today_value = value.get("current", None)
     assert today_value is not None, "Today value is not found"
 
-    today_response = {
-        f"{today_date}": today_value,
-        f"{TELEGRAM_NAME_MAP[key]}": today_value,
-    }
-
     sevendays_ago_date = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
     sevendays_ago_value = value.get("previous", None)
     assert sevendays_ago_value is not None, "Sevendays ago value is not found"
 
-    sevendays_ago_response = {
-        f"{sevendays_ago_date}": sevendays_ago_value,
-        f"{TELEGRAM_NAME_MAP[key]}": sevendays_ago_value,
-    }
+    return AbsValueAndPrev(
+        date=today_date,
+        current=today_value,
+        previous_date=sevendays_ago_date,
+        previous=sevendays_ago_value,
+    )
+
+
+def get_stats_fingerprint(
+    stats: dict[str, Any], include_posts: bool = False
+) -> dict[str, Any]:
+    """
+    Summarize a stats response as its period and a digest of its payloads
 
-    return [today_response, sevendays_ago_response]
+    Two responses with the same fingerprint produce the same rows. With
+    `include_posts`, the ids of the recent posts are digested too, so new posts
+    are picked up (their counters are not, they change on every response).
+    """
+    period = stats.get("period", None) or {}
+    min_date = period.get("min_date", None)
+    max_date = period.get("max_date", None)
+
+    digest = hashlib.sha256()
+
+    for key in sorted(stats.keys()):
+        value = stats[key]
+
+        if is_processable_graph(key, value):
+            digest.update(key.encode())
+            digest.update(value["json"]["data"].encode())
+        elif is_channel_state(key, value):
+            digest.update(key.encode())
+            digest.update(f"{value.get('current')}:{value.get('previous')}".encode())
+
+    if include_posts:
+        message_ids = sorted(
+            counter["msg_id"]
+            for counter in stats.get("recent_posts_interactions", None) or []
+            if counter.get("_", None) == "PostInteractionCountersMessage"
+        )
+        digest.update(f"posts:{message_ids}".encode())
+
+    return {
+        "period": [
+            min_date.isoformat() if min_date is not None else None,
+            max_date.isoformat() if max_date is not None else None,
+        ],
+        "digest": digest.hexdigest(),
+    }
@@ -0,0 +1,79 @@
+import pytest
+
+from src.shared import lease_store as lease_store_module
+from src.shared.lease_store import LeaseStore
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    fake_clock = FakeClock()
+    monkeypatch.setattr(lease_store_module.time, "time", fake_clock.time)
+    return fake_clock
+
+
+@pytest.fixture
+def workers(tmp_path):
+    path = str(tmp_path / "leases.db")
+    first = LeaseStore(path, "worker-1", lease_ttl=60, completed_ttl=600)
+    second = LeaseStore(path, "worker-2", lease_ttl=60, completed_ttl=600)
+
+    yield first, second
+
+    first.close()
+    second.close()
+
+
+def test_only_one_worker_wins_a_claim(workers, clock):
+    first, second = workers
+
+    assert first.claim("channel")
+    assert not second.claim("channel")
+    assert not first.claim("channel")
+
+    assert first.renew("channel")
+    assert not second.renew("channel")
+
+
+def test_expired_lease_can_be_reclaimed(workers, clock):
+    first, second = workers
+
+    assert first.claim("channel")
+
+    clock.now += 59
+    assert not second.claim("channel")
+
+    clock.now += 1
+    assert second.claim("channel")
+    assert not first.renew("channel")
+
+
+def test_completed_channel_blocks_other_workers(workers, clock):
+    first, second = workers
+
+    assert first.claim("channel")
+    first.complete("channel")
+
+    # Completed channels stay blocked past the lease TTL
+    clock.now += 120
+    assert not second.claim("channel")
+    assert not first.renew("channel")
+
+    clock.now += 600
+    assert second.claim("channel")
+
+
+def test_released_channel_can_be_claimed(workers, clock):
+    first, second = workers
+
+    assert first.claim("channel")
+    first.release("channel")
+
+    assert second.claim("channel")
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from src import orchestration
+
+
+class FakeLeaseStore:
+    def __init__(self, renewals: list[bool]) -> None:
+        self.renewals = renewals
+        self.calls: list[str] = []
+
+    def claim(self, channel: str) -> bool:
+        self.calls.append("claim")
+        return True
+
+    def renew(self, channel: str) -> bool:
+        self.calls.append("renew")
+        return self.renewals.pop(0)
+
+    def complete(self, channel: str) -> None:
+        self.calls.append("complete")
+
+    def release(self, channel: str) -> None:
+        self.calls.append("release")
+
+
+@pytest.fixture
+def sync(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    events: list[str] = []
+
+    async def sync_telegram_channel(*args) -> bool:
+        events.append("started")
+        await asyncio.sleep(0.05)
+        events.append("finished")
+        return True
+
+    monkeypatch.setattr(orchestration, "LEASE_RENEW_INTERVAL_SECONDS", 0.01)
+    monkeypatch.setattr(orchestration, "sync_telegram_channel", sync_telegram_channel)
+    return events
+
+
+def run_leased_sync(lease_store: FakeLeaseStore) -> bool | None:
+    return asyncio.run(
+        orchestration.sync_leased_telegram_channel(
+            lease_store, None, None, None, "channel"
+        )
+    )
+
+
+def test_renewed_lease_completes_the_channel(sync):
+    lease_store = FakeLeaseStore(renewals=[True] * 10)
+
+    assert run_leased_sync(lease_store) is True
+    assert sync == ["started", "finished"]
+    assert lease_store.calls[-1] == "complete"
+
+
+def test_lost_lease_cancels_the_sync(sync):
+    lease_store = FakeLeaseStore(renewals=[False])
+
+    assert run_leased_sync(lease_store) is None
+    assert sync == ["started"]
+    assert "complete" not in lease_store.calls
+
+
+def test_failed_renewal_cancels_the_sync(sync):
+    lease_store = FakeLeaseStore(renewals=[])
+
+    assert run_leased_sync(lease_store) is None
+    assert sync == ["started"]
+    assert "complete" not in lease_store.calls
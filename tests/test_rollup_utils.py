@@ -0,0 +1,86 @@
+import pandas as pd
+
+from src.shared.rollup_utils import compute_timeseries_rollups, get_rollup_columns
+
+
+def make_timeseries(days: int, first_day: str = "2026-01-01") -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "date": pd.date_range(first_day, periods=days),
+            "handle": "channel",
+            "joined": 4,
+            "left": 1,
+            "mute": 2,
+            "followers": 100,
+        }
+    )
+
+
+def test_empty_timeseries_yields_empty_rollups():
+    rollups = compute_timeseries_rollups(make_timeseries(0))
+
+    assert rollups.empty
+    assert list(rollups.columns) == ["date", "handle", *get_rollup_columns()]
+
+
+def test_days_without_a_full_short_window_are_dropped():
+    rollups = compute_timeseries_rollups(make_timeseries(10))
+
+    assert rollups["date"].iloc[0] == pd.Timestamp("2026-01-07")
+    assert len(rollups) == 4
+    assert (rollups["handle"] == "channel").all()
+
+
+def test_incomplete_long_window_is_left_empty():
+    rollups = compute_timeseries_rollups(make_timeseries(10))
+
+    assert (rollups["net_growth_7d"] == 21).all()
+    assert (rollups["churn_rate_7d"] == 0.25).all()
+    assert (rollups["mute_ratio_7d"] == 0.14).all()
+    assert (
+        rollups[["net_growth_30d", "churn_rate_30d", "mute_ratio_30d"]]
+        .isna()
+        .all(axis=None)
+    )
+
+
+def test_complete_long_window_is_filled():
+    rollups = compute_timeseries_rollups(make_timeseries(31))
+
+    complete = rollups[rollups["net_growth_30d"].notna()]
+
+    assert list(complete["date"]) == [
+        pd.Timestamp("2026-01-30"),
+        pd.Timestamp("2026-01-31"),
+    ]
+    assert (complete["net_growth_30d"] == 90).all()
+    assert (complete["mute_ratio_30d"] == 0.6).all()
+
+
+def test_since_keeps_only_later_window_ends():
+    rollups = compute_timeseries_rollups(
+        make_timeseries(20), since=pd.Timestamp("2026-01-15")
+    )
+
+    assert rollups["date"].iloc[0] == pd.Timestamp("2026-01-15")
+    assert rollups["date"].iloc[-1] == pd.Timestamp("2026-01-20")
+    # Days before `since` still count towards windows ending after it
+    assert (rollups["net_growth_7d"] == 21).all()
+
+
+def test_since_before_first_full_window_still_drops_partial_days():
+    rollups = compute_timeseries_rollups(
+        make_timeseries(10), since=pd.Timestamp("2026-01-01")
+    )
+
+    assert rollups["date"].iloc[0] == pd.Timestamp("2026-01-07")
+
+
+def test_churn_rate_is_empty_without_joins():
+    timeseries = make_timeseries(7)
+    timeseries["joined"] = 0
+
+    rollups = compute_timeseries_rollups(timeseries)
+
+    assert rollups["churn_rate_7d"].isna().all()
+    assert (rollups["net_growth_7d"] == -7).all()
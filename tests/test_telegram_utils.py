@@ -0,0 +1,100 @@
+import json
+from datetime import datetime, timedelta
+
+from src.orchestration import process_telegram_stats
+from src.telegram.telegram_utils import process_graph_data
+
+FIRST_DAY = datetime(2026, 1, 1)
+
+
+def make_graph(names: dict[str, str], days: int, value: int = 1) -> dict:
+    timestamps = [
+        int((FIRST_DAY + timedelta(days=day)).timestamp() * 1000) for day in range(days)
+    ]
+    columns = [["x", *timestamps]]
+    columns += [[column, *([value] * days)] for column in names]
+
+    return {
+        "_": "StatsGraph",
+        "json": {
+            "_": "DataJSON",
+            "data": json.dumps({"columns": columns, "names": names}),
+        },
+    }
+
+
+def make_stats(days: int) -> dict:
+    return {
+        "growth_graph": make_graph({"y0": "Total followers"}, days, 100),
+        "followers_graph": make_graph({"y0": "Joined", "y1": "Left"}, days, 5),
+        "mute_graph": make_graph({"y0": "Muted"}, days, 2),
+    }
+
+
+def test_graph_without_watermark_is_parsed_in_full():
+    graph = make_graph({"y0": "Muted"}, 10)
+
+    results = process_graph_data(graph)
+
+    assert results.dates[0] == "2026-01-01"
+    assert results.dates[-1] == "2026-01-10"
+    assert results.columns == {"Muted": [1] * 10}
+
+
+def test_graph_is_parsed_from_recheck_days_before_watermark():
+    graph = make_graph({"y0": "Muted"}, 20)
+
+    results = process_graph_data(graph, since="2026-01-10", recheck_days=3)
+
+    assert results.dates == [f"2026-01-{day:02d}" for day in range(7, 21)]
+    assert len(results.columns["Muted"]) == len(results.dates)
+
+
+def test_graph_with_watermark_past_its_end_keeps_recheck_days():
+    graph = make_graph({"y0": "Muted"}, 10)
+
+    results = process_graph_data(graph, since="2026-01-10", recheck_days=0)
+
+    assert results.dates == ["2026-01-10"]
+
+
+def test_divergent_watermarks_do_not_produce_zero_rows():
+    watermarks = {
+        "growth_graph": "2026-01-20",
+        "followers_graph": "2026-01-20",
+        "mute_graph": "2026-01-05",
+    }
+
+    _, timeseries_data, new_watermarks = process_telegram_stats(
+        make_stats(25), "channel", watermarks, recheck_days=3
+    )
+
+    dates = timeseries_data["date"].dt.strftime("%Y-%m-%d").tolist()
+    assert dates[0] == "2026-01-02"
+    assert dates[-1] == "2026-01-25"
+    assert (timeseries_data["followers"] == 100).all()
+    assert (timeseries_data["joined"] == 5).all()
+    assert (timeseries_data["mute"] == 2).all()
+    assert set(new_watermarks.values()) == {"2026-01-25"}
+
+
+def test_graph_without_watermark_parses_every_graph_in_full():
+    watermarks = {"growth_graph": "2026-01-20", "followers_graph": "2026-01-20"}
+
+    _, timeseries_data, _ = process_telegram_stats(
+        make_stats(25), "channel", watermarks, recheck_days=3
+    )
+
+    assert len(timeseries_data) == 25
+    assert (timeseries_data["followers"] == 100).all()
+
+
+def test_days_past_the_shortest_graph_are_left_for_the_next_run():
+    stats = make_stats(25)
+    stats["mute_graph"] = make_graph({"y0": "Muted"}, 24, 2)
+
+    _, timeseries_data, watermarks = process_telegram_stats(stats, "channel")
+
+    assert timeseries_data["date"].max() == datetime(2026, 1, 24)
+    assert (timeseries_data["mute"] == 2).all()
+    assert set(watermarks.values()) == {"2026-01-24"}